@@ -376,6 +376,54 @@ AND NOT EXISTS (SELECT 1 FROM sys.columns WHERE object_id = OBJECT_ID(N'dbo.prod
 BEGIN
     ALTER TABLE dbo.products ADD sales_price FLOAT NOT NULL DEFAULT 0;
 END
+"""))
+                # Indexes declared in models.py are only created with new tables; add them to existing ones
+                with engine.begin() as conn:
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_orders_mr_id_customer_id' AND object_id = OBJECT_ID(N'dbo.orders'))
+BEGIN
+    CREATE INDEX ix_orders_mr_id_customer_id ON dbo.orders (mr_id, customer_id);
+END
+"""))
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_dws_fefo' AND object_id = OBJECT_ID(N'dbo.dealer_wise_stock_details'))
+BEGIN
+    CREATE INDEX ix_dws_fefo ON dbo.dealer_wise_stock_details (product_code, status, dealer_unique_id, expiry_date)
+    WHERE blocked_quantity > 0;
+END
+"""))
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_dws_dealer_status_code' AND object_id = OBJECT_ID(N'dbo.dealer_wise_stock_details'))
+BEGIN
+    CREATE INDEX ix_dws_dealer_status_code ON dbo.dealer_wise_stock_details (dealer_unique_id, status, product_code)
+    WHERE available_for_sale > 0;
+END
+"""))
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_users_role_area' AND object_id = OBJECT_ID(N'dbo.users'))
+BEGIN
+    CREATE INDEX ix_users_role_area ON dbo.users (role, area);
+END
+"""))
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_orders_mr_id_status' AND object_id = OBJECT_ID(N'dbo.orders'))
+BEGIN
+    CREATE INDEX ix_orders_mr_id_status ON dbo.orders (mr_id, status);
+END
+"""))
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_cart_items_user_id' AND object_id = OBJECT_ID(N'dbo.cart_items'))
+BEGIN
+    CREATE INDEX ix_cart_items_user_id ON dbo.cart_items (user_id);
+END
+"""))
+                    conn.execute(text("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_dws_code_status_dealer' AND object_id = OBJECT_ID(N'dbo.dealer_wise_stock_details'))
+BEGIN
+    CREATE INDEX ix_dws_code_status_dealer ON dbo.dealer_wise_stock_details (product_code, status, dealer_unique_id, expiry_date)
+    INCLUDE (available_for_sale)
+    WHERE available_for_sale > 0;
+END
 """))
             except Exception:
                 # Non-fatal: continue app startup even if migration fails
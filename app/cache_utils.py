@@ -0,0 +1,112 @@
+"""
+In-process caching utilities for hot, slowly-changing data.
+
+This module provides:
+- Thread-safe TTL cache with a bounded size
+- Decorator for caching function results with expiry
+- Manual invalidation via cache_clear()/cache.pop()
+"""
+import time
+import logging
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe cache whose entries expire after a fixed time.
+
+    Args:
+        maxsize: Maximum number of entries kept (oldest evicted first)
+        ttl: Seconds an entry stays valid
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        """Store value for key"""
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key, default=None):
+        """Remove key and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else default
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self):
+        """Drop expired entries, then the oldest one if still full (lock held)"""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at < now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            self._data.pop(next(iter(self._data)))
+
+
+def ttl_cached(ttl: float = 60, maxsize: int = 128, cache_if=None):
+    """
+    Decorator to cache a function's results for ttl seconds.
+
+    Args:
+        ttl: Seconds a result stays valid
+        maxsize: Maximum number of cached argument combinations
+        cache_if: Optional predicate; results for which it returns False are not cached
+
+    Usage:
+        @ttl_cached(ttl=60, cache_if=bool)
+        def load_products():
+            ...
+
+        load_products.cache_clear()  # invalidate
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = func(*args, **kwargs)
+            if cache_if is None or cache_if(value):
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
@@ -16,6 +16,9 @@ from app.email_utils import send_email_with_attachment, create_email_template
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round-trip when exporting a table
+REPORT_BATCH_SIZE = 1000
+
 class CompanyReportService:
     """Service for generating company reports from database"""
     
@@ -91,14 +94,15 @@ class CompanyReportService:
         }
     }
     
-    def get_available_tables(self):
+    @classmethod
+    def get_available_tables(cls):
         """Get list of available tables for export"""
         return {
             table_key: {
                 'name': table_info['name'],
                 'columns': table_info['columns']
             }
-            for table_key, table_info in self.AVAILABLE_TABLES.items()
+            for table_key, table_info in cls.AVAILABLE_TABLES.items()
         }
     
     def generate_report(self, table_key, selected_columns=None, filters=None):
@@ -154,16 +158,7 @@ class CompanyReportService:
             if filters:
                 query = self._apply_filters(query, model, filters)
             
-            # Get all records
-            records = query.all()
-            
-            if not records:
-                return {
-                    'success': False,
-                    'error': f'No data found in {table_info["name"]}'
-                }
-            
-            # Generate CSV
+            # Stream records in batches so large tables are never fully hydrated at once
             csv_buffer = io.StringIO()
             csv_writer = csv.writer(csv_buffer)
             
@@ -171,59 +166,17 @@ class CompanyReportService:
             csv_writer.writerow(columns_to_export)
             
             # Write data rows
-            for record in records:
-                row = []
-                for col in columns_to_export:
-                    try:
-                        # Try to get attribute value directly
-                        if hasattr(record, col):
-                            value = getattr(record, col)
-                        else:
-                            # If attribute doesn't exist, try to_dict() method if available
-                            if hasattr(record, 'to_dict'):
-                                record_dict = record.to_dict()
-                                value = record_dict.get(col, None)
-                                # If to_dict returns empty string or None, keep as None (will be converted to N/A later)
-                                if value == '':
-                                    value = None
-                            else:
-                                value = None
-                        
-                        # Format datetime objects
-                        if isinstance(value, datetime):
-                            value = value.strftime('%Y-%m-%d %H:%M:%S')
-                        elif hasattr(value, 'isoformat') and value is not None:  # Handle date objects
-                            try:
-                                value = value.isoformat()
-                            except:
-                                value = str(value)
-                        
-                        # Convert None to N/A
-                        if value is None:
-                            value = 'N/A'
-                        
-                        # Convert empty string to N/A
-                        if isinstance(value, str) and value.strip() == '':
-                            value = 'N/A'
-                        
-                        # Convert boolean to string
-                        if isinstance(value, bool):
-                            value = 'Yes' if value else 'No'
-                        
-                        # Ensure value is a string for CSV
-                        if not isinstance(value, str):
-                            value = str(value)
-                            
-                    except AttributeError:
-                        # Column doesn't exist on this model - set to N/A
-                        value = 'N/A'
-                    except Exception as e:
-                        logger.warning(f"Error extracting column {col} from record {record.id if hasattr(record, 'id') else 'unknown'}: {str(e)}")
-                        value = 'N/A'
-                    
-                    row.append(value)
-                
-                csv_writer.writerow(row)
+            row_count = 0
+            for record in query.yield_per(REPORT_BATCH_SIZE):
+                csv_writer.writerow(self._format_record_row(record, columns_to_export))
+                row_count += 1
+            
+            if not row_count:
+                csv_buffer.close()
+                return {
+                    'success': False,
+                    'error': f'No data found in {table_info["name"]}'
+                }
             
             # Get CSV data
             csv_data = csv_buffer.getvalue()
@@ -233,13 +186,13 @@ class CompanyReportService:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"RB_Report_{table_info['name'].replace(' ', '_')}_{timestamp}.csv"
             
-            logger.info(f"✓ Generated report: {filename} with {len(records)} rows")
+            logger.info(f"✓ Generated report: {filename} with {row_count} rows")
             
             return {
                 'success': True,
                 'csv_data': csv_data,
                 'filename': filename,
-                'row_count': len(records),
+                'row_count': row_count,
                 'column_count': len(columns_to_export),
                 'table_name': table_info['name']
             }
@@ -251,6 +204,62 @@ class CompanyReportService:
                 'error': str(e)
             }
     
+    def _format_record_row(self, record, columns):
+        """CSV row of display strings for one record"""
+        record_dict = None
+        row = []
+        for col in columns:
+            try:
+                # Try to get attribute value directly
+                if hasattr(record, col):
+                    value = getattr(record, col)
+                else:
+                    # If attribute doesn't exist, try to_dict() method if available (built once per record)
+                    if hasattr(record, 'to_dict'):
+                        if record_dict is None:
+                            record_dict = record.to_dict()
+                        value = record_dict.get(col, None)
+                        # If to_dict returns empty string or None, keep as None (will be converted to N/A later)
+                        if value == '':
+                            value = None
+                    else:
+                        value = None
+                
+                # Format datetime objects
+                if isinstance(value, datetime):
+                    value = value.strftime('%Y-%m-%d %H:%M:%S')
+                elif hasattr(value, 'isoformat') and value is not None:  # Handle date objects
+                    try:
+                        value = value.isoformat()
+                    except:
+                        value = str(value)
+                
+                # Convert None to N/A
+                if value is None:
+                    value = 'N/A'
+                
+                # Convert empty string to N/A
+                if isinstance(value, str) and value.strip() == '':
+                    value = 'N/A'
+                
+                # Convert boolean to string
+                if isinstance(value, bool):
+                    value = 'Yes' if value else 'No'
+                
+                # Ensure value is a string for CSV
+                if not isinstance(value, str):
+                    value = str(value)
+                    
+            except AttributeError:
+                # Column doesn't exist on this model - set to N/A
+                value = 'N/A'
+            except Exception as e:
+                logger.warning(f"Error extracting column {col} from record {record.id if hasattr(record, 'id') else 'unknown'}: {str(e)}")
+                value = 'N/A'
+            
+            row.append(value)
+        return row
+    
     def _apply_filters(self, query, model, filters):
         """Apply filters to query"""
         try:
@@ -1,13 +1,63 @@
 import logging
 from datetime import datetime
-from sqlalchemy import text, and_, or_, func
+from sqlalchemy import text, and_, or_, func, event
+from sqlalchemy.orm import Session, contains_eager, object_session, selectinload
 from app import db
 from app.models import (User, Product, Order, OrderItem, CartItem, ChatSession, 
                         Conversation, PendingOrderProducts, Customer, FOC, DealerWiseStockDetails)
+from app.cache_utils import TTLCache
 
 # Single logger initialization - logging.basicConfig should only be called once in __init__.py
 logger = logging.getLogger(__name__)
 
+# Aggregated dealer stock per area (see get_products_from_dealer_stock)
+_dealer_stock_cache = TTLCache(maxsize=128, ttl=60)
+# The same listing indexed by product_code (see get_product_from_dealer_stock)
+_dealer_stock_by_code_cache = TTLCache(maxsize=128, ttl=60)
+
+
+def invalidate_dealer_stock_cache(area=None):
+    """Drop cached dealer stock for one area, or for all areas"""
+    if area is None:
+        _dealer_stock_cache.clear()
+        _dealer_stock_by_code_cache.clear()
+    else:
+        _dealer_stock_cache.pop(area)
+        _dealer_stock_by_code_cache.pop(area)
+
+
+@event.listens_for(DealerWiseStockDetails, 'after_insert')
+@event.listens_for(DealerWiseStockDetails, 'after_update')
+@event.listens_for(DealerWiseStockDetails, 'after_delete')
+def _on_dealer_stock_change(mapper, connection, target):
+    """Any ORM write to dealer stock invalidates the cached area listings"""
+    invalidate_dealer_stock_cache()
+    # A concurrent request can re-cache pre-commit rows between flush and commit,
+    # so mark the session and invalidate again once the write is committed
+    session = object_session(target)
+    if session is not None:
+        session.info['dealer_stock_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit_invalidate_dealer_stock(session):
+    """Drop cached area listings again after a commit that wrote dealer stock"""
+    if session.info.pop('dealer_stock_dirty', False):
+        invalidate_dealer_stock_cache()
+
+
+# Distributor unique IDs per area; distributors change rarely, so cache briefly
+_dealer_ids_cache = TTLCache(maxsize=64, ttl=30)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _on_user_change(mapper, connection, target):
+    """A user write may add, move or remove a distributor, so drop the cached area lists"""
+    _dealer_ids_cache.clear()
+
+
 class DatabaseService:
     """Service for database operations"""
     
@@ -88,33 +138,66 @@ class DatabaseService:
         """Get product by name"""
         return Product.query.filter_by(product_name=product_name).first()
     
+    def get_dealer_unique_ids_by_area(self, area):
+        """Unique IDs of the distributors in an area (cached briefly)"""
+        dealer_ids = _dealer_ids_cache.get(area)
+        if dealer_ids is None:
+            dealer_ids = [
+                unique_id for (unique_id,) in db.session.query(User.unique_id).filter_by(
+                    role='distributor', area=area
+                ).all()
+            ]
+            _dealer_ids_cache.set(area, dealer_ids)
+        return list(dealer_ids)
+    
     def get_products_from_dealer_stock(self, user_area):
         """
         Get products from dealer_wise_stock_details for MRs based on area
         Returns list of dicts with product info and available quantities
+        Results are cached per area for a short time; stock writes invalidate the cache.
         """
+        products = _dealer_stock_cache.get(user_area)
+        if products is None:
+            products = self._load_products_from_dealer_stock(user_area)
+            if products:
+                _dealer_stock_cache.set(user_area, products)
+        # Callers may modify the dicts, so hand out copies
+        return [dict(product) for product in products]
+    
+    def get_product_from_dealer_stock(self, user_area, product_code):
+        """Single product from the area's dealer stock by product_code, or None"""
+        by_code = _dealer_stock_by_code_cache.get(user_area)
+        if by_code is None:
+            by_code = {p['product_code']: p for p in self.get_products_from_dealer_stock(user_area)}
+            if by_code:
+                _dealer_stock_by_code_cache.set(user_area, by_code)
+        product = by_code.get(product_code)
+        return dict(product) if product else None
+    
+    def _load_products_from_dealer_stock(self, user_area):
+        """Query aggregated confirmed dealer stock for an area"""
         try:
             # Find dealers in the user's area
-            dealers_in_area = User.query.filter_by(
-                role='distributor',
-                area=user_area
-            ).all()
+            dealer_unique_ids = self.get_dealer_unique_ids_by_area(user_area)
             
-            if not dealers_in_area:
+            if not dealer_unique_ids:
                 self.logger.warning(f"No dealers found in area {user_area}")
                 return []
             
-            dealer_unique_ids = [d.unique_id for d in dealers_in_area]
-            
             # Get confirmed stock from dealers in this area
-            # Group by product to get aggregate availability
+            # Group by product to get aggregate availability; catalogue price/team come from the same query
             stock_details = db.session.query(
                 DealerWiseStockDetails.product_id,
                 DealerWiseStockDetails.product_code,
                 DealerWiseStockDetails.product_name,
                 func.sum(DealerWiseStockDetails.available_for_sale).label('total_available'),
                 func.avg(DealerWiseStockDetails.sales_price).label('avg_sales_price'),
-                func.min(DealerWiseStockDetails.expiry_date).label('earliest_expiry')
+                func.min(DealerWiseStockDetails.expiry_date).label('earliest_expiry'),
+                Product.id.label('catalogue_id'),
+                Product.price.label('catalogue_price'),
+                Product.team.label('catalogue_team')
+            ).outerjoin(
+                Product, Product.id == DealerWiseStockDetails.product_id
             ).filter(
                 DealerWiseStockDetails.dealer_unique_id.in_(dealer_unique_ids),
                 DealerWiseStockDetails.status == 'confirmed',
@@ -122,9 +205,22 @@ class DatabaseService:
             ).group_by(
                 DealerWiseStockDetails.product_id,
                 DealerWiseStockDetails.product_code,
-                DealerWiseStockDetails.product_name
+                DealerWiseStockDetails.product_name,
+                Product.id,
+                Product.price,
+                Product.team
             ).all()
             
+            # Active FOC schemes for every catalogue product in one query
+            catalogue_ids = {stock.catalogue_id for stock in stock_details if stock.catalogue_id}
+            focs_by_product = {}
+            if catalogue_ids:
+                for foc in FOC.query.filter(
+                    FOC.product_id.in_(catalogue_ids),
+                    FOC.is_active == True
+                ).order_by(FOC.id).all():
+                    focs_by_product.setdefault(foc.product_id, foc)
+            
             products = []
             for stock in stock_details:
                 product_data = {
@@ -136,17 +232,12 @@ class DatabaseService:
                     'earliest_expiry': stock.earliest_expiry
                 }
                 
-                # Get FOC schemes if product_id exists
-                if stock.product_id:
-                    product = Product.query.get(stock.product_id)
-                    if product:
-                        product_data['price'] = product.price
-                        product_data['team'] = product.team
-                        
-                        # Get FOC schemes
-                        foc = FOC.query.filter_by(product_id=stock.product_id, is_active=True).first()
-                        if foc:
-                            product_data['foc'] = foc.to_dict()
+                if stock.catalogue_id:
+                    product_data['price'] = stock.catalogue_price
+                    product_data['team'] = stock.catalogue_team
+                    foc = focs_by_product.get(stock.catalogue_id)
+                    if foc:
+                        product_data['foc'] = foc.to_dict()
                 
                 products.append(product_data)
             
@@ -308,7 +399,10 @@ class DatabaseService:
         area = distributor_user.area
         
         # Build query - filter by MR.area matching distributor.area
-        query = Order.query.join(User, Order.mr_id == User.id).filter(User.area == area)
+        # contains_eager fills Order.mr from the joined users row instead of lazy-loading it per order
+        query = Order.query.join(User, Order.mr_id == User.id).options(
+            contains_eager(Order.mr)
+        ).filter(User.area == area)
         
         # Apply status filter
         if status_filter:
@@ -389,6 +483,23 @@ class DatabaseService:
                 pass
             return None
     
+    def save_conversations(self, rows):
+        """Save several conversations in one insert and commit (rows are dicts of Conversation columns)"""
+        if not rows:
+            return 0
+        try:
+            db.session.bulk_insert_mappings(Conversation, rows)
+            db.session.commit()
+            self.logger.info(f"Saved {len(rows)} conversation(s)")
+            return len(rows)
+        except Exception as e:
+            self.logger.error(f"Error saving conversations: {str(e)}")
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            return 0
+    
     def get_conversation_history(self, user_id, limit=50):
         """Get conversation history for user"""
         return Conversation.query.filter_by(user_id=user_id).order_by(
@@ -438,14 +549,109 @@ class DatabaseService:
                 pass
             raise
     
+    def add_many_to_cart(self, user_id, items):
+        """
+        Add several items to a user's cart in one transaction with row-level locking.
+        items: list of dicts with product_id, product_code, product_name, quantity, unit_price
+        Returns the list of created/updated cart items in input order.
+        """
+        try:
+            from app.db_locking import with_row_lock
+            
+            product_ids = [item['product_id'] for item in items]
+            existing_query = CartItem.query.filter(
+                CartItem.user_id == user_id,
+                CartItem.product_id.in_(product_ids)
+            )
+            existing = {c.product_id: c for c in with_row_lock(existing_query, nowait=False).all()}
+            
+            now = datetime.utcnow()
+            cart_items = []
+            for item in items:
+                cart_item = existing.get(item['product_id'])
+                if cart_item:
+                    # Update quantity
+                    cart_item.quantity += item['quantity']
+                    cart_item.total_price = cart_item.unit_price * cart_item.quantity
+                    cart_item.updated_at = now
+                else:
+                    cart_item = CartItem(
+                        user_id=user_id,
+                        product_id=item['product_id'],
+                        product_code=item['product_code'],
+                        product_name=item['product_name'],
+                        quantity=item['quantity'],
+                        unit_price=item['unit_price'],
+                        total_price=item['unit_price'] * item['quantity']
+                    )
+                    db.session.add(cart_item)
+                    existing[item['product_id']] = cart_item
+                cart_items.append(cart_item)
+            
+            db.session.commit()
+            return cart_items
+        except Exception as e:
+            self.logger.error(f"Error adding items to cart: {str(e)}")
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            raise
+    
     def get_cart_items(self, user_id):
         """Get user's cart items"""
         try:
-            return CartItem.query.filter_by(user_id=user_id).all()
+            return CartItem.query.options(selectinload(CartItem.product)).filter_by(user_id=user_id).all()
         except Exception as e:
             self.logger.error(f"Error getting cart items: {str(e)}")
             return []
     
+    def get_cart_rows(self, user_id):
+        """Cart lines as column tuples (no ORM objects), with the display product name resolved in SQL"""
+        try:
+            return db.session.query(
+                CartItem.id,
+                CartItem.product_id,
+                CartItem.product_code,
+                func.coalesce(
+                    func.nullif(CartItem.product_name, ''), Product.product_name, CartItem.product_code
+                ).label('product_name'),
+                CartItem.quantity,
+                CartItem.unit_price,
+                CartItem.total_price
+            ).outerjoin(Product, Product.id == CartItem.product_id).filter(
+                CartItem.user_id == user_id
+            ).order_by(CartItem.id).all()
+        except Exception as e:
+            self.logger.error(f"Error getting cart rows: {str(e)}")
+            return []
+    
+    def get_cart_fingerprint(self, user_id):
+        """Cheap aggregate that changes whenever the user's cart rows are added, updated or removed"""
+        try:
+            count, max_id, quantity, last_updated = db.session.query(
+                func.count(CartItem.id),
+                func.max(CartItem.id),
+                func.sum(CartItem.quantity),
+                func.max(CartItem.updated_at)
+            ).filter(CartItem.user_id == user_id).one()
+            return (count, max_id, quantity, last_updated)
+        except Exception as e:
+            self.logger.error(f"Error getting cart fingerprint: {str(e)}")
+            return None
+    
+    def get_cart_totals(self, user_id):
+        """Stored cart subtotal and item count for a user in one aggregate: (subtotal, count)"""
+        try:
+            subtotal, count = db.session.query(
+                func.coalesce(func.sum(CartItem.total_price), 0),
+                func.count(CartItem.id)
+            ).filter(CartItem.user_id == user_id).one()
+            return float(subtotal), int(count)
+        except Exception as e:
+            self.logger.error(f"Error getting cart totals: {str(e)}")
+            return 0.0, 0
+    
     def update_cart_item_quantity(self, cart_item_id, quantity):
         """Update cart item quantity"""
         try:
@@ -812,8 +1018,7 @@ class DatabaseService:
                 }
             
             # Get sales price from dealer stock in user's area
-            dealers_in_area = User.query.filter_by(role='distributor', area=user_area).all()
-            dealer_ids = [d.unique_id for d in dealers_in_area]
+            dealer_ids = self.get_dealer_unique_ids_by_area(user_area)
             
             stock = DealerWiseStockDetails.query.filter(
                 DealerWiseStockDetails.dealer_unique_id.in_(dealer_ids),
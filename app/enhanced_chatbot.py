@@ -1,5 +1,8 @@
-from flask import Blueprint, render_template, request, jsonify, session, current_app, make_response, send_file
+from flask import Blueprint, render_template, request, jsonify, session, current_app, make_response, send_file, g, stream_with_context
 from app import db 
+from sqlalchemy import func, cast, Date, select, insert, bindparam, or_, case
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import aliased, joinedload, contains_eager
 from app.models import Conversation, User, Product, Order, OrderItem, ChatSession, CartItem, DealerWiseStockDetails, Customer, FOC, PendingOrderProducts
 from app.database_service import DatabaseService
 from app.llm_classification_service import LLMClassificationService
@@ -15,19 +18,57 @@ from app.stock_management_service import StockManagementService
 from app.azure_search_service import get_search_service
 from app.translation_service import get_translation_service
 from app.azure_speech_service import get_speech_service
+from app.cache_utils import TTLCache, ttl_cached
+from app.input_validation import (
+    validate_and_sanitize_order_id, validate_quantity,
+    sanitize_string, MAX_LENGTHS, sanitize_dict
+)
 import logging
 import time
+from functools import lru_cache
+from collections import namedtuple
+from itertools import chain
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import json
+import hashlib
 import os
 from io import BytesIO
 import re
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+try:
+    # Optional constant-memory xlsx writer; openpyxl write-only mode is the fallback
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+try:
+    # Optional C ISO-8601 parser; stdlib fromisoformat is the fallback
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    _parse_iso = datetime.fromisoformat
 
 chatbot_bp = Blueprint('enhanced_chatbot', __name__)
 
 # Single logger initialization - logging.basicConfig should only be called once in __init__.py
 logger = logging.getLogger(__name__)
 
+# Background workers for fire-and-forget writes (conversation logging)
+_background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ChatBackground')
+
+# LLM completions keyed by a hash of (model, prompt); repeated prompts skip the Groq call
+_LLM_CACHE = TTLCache(maxsize=2048, ttl=900)
+
+# Azure AI Search results keyed by ('search', query, top) / ('detail', name); absorbs repeated lookups
+_search_cache = TTLCache(maxsize=512, ttl=60)
+
+# GET /cart payloads keyed by user, cart fingerprint and selected customer; absorbs frontend polling
+_cart_response_cache = TTLCache(maxsize=1024, ttl=30)
+
 # Initialize services
 db_service = None
 classification_service = None
@@ -37,6 +78,93 @@ llm_order_service = None
 pricing_service = None
 llm_service = None
 
+def fast_jsonify(obj, stream_key=None):
+    """
+    jsonify() replacement backed by orjson for large payloads (falls back to jsonify).
+    If stream_key names a list in obj, that list is streamed one element at a time.
+    """
+    if not ORJSON_AVAILABLE:
+        return jsonify(obj)
+    if stream_key and isinstance(obj.get(stream_key), list):
+        return current_app.response_class(_iter_json_object(obj, stream_key), mimetype='application/json')
+    return current_app.response_class(
+        orjson.dumps(obj),
+        mimetype='application/json'
+    )
+
+def _emit_listing(response):
+    """Serialize a (dict, status) order-listing result once, at the route exit, streaming its orders"""
+    if isinstance(response, tuple) and isinstance(response[0], dict):
+        data, status_code = response
+        return fast_jsonify(data, stream_key='orders'), status_code
+    return response
+
+def _iter_json_object(obj, stream_key):
+    """Yield obj as JSON in chunks, emitting obj[stream_key] element by element"""
+    yield b'{'
+    for index, (key, value) in enumerate(obj.items()):
+        if index:
+            yield b','
+        yield orjson.dumps(str(key)) + b':'
+        if key == stream_key:
+            yield b'['
+            for item_index, item in enumerate(value):
+                if item_index:
+                    yield b','
+                yield orjson.dumps(item)
+            yield b']'
+        else:
+            yield orjson.dumps(value)
+    yield b'}'
+
+def _cached_completion(client, model, prompt, temperature, max_tokens):
+    """Text of a single-message chat completion, served from _LLM_CACHE when the same prompt was seen recently"""
+    key = hashlib.blake2b(f"{model}\0{prompt}".encode('utf-8'), digest_size=16).digest()
+    content = _LLM_CACHE.get(key)
+    if content is None:
+        response_obj = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response_obj.choices[0].message.content
+        if content:
+            _LLM_CACHE.set(key, content)
+    return content
+
+def _stream_completion(client, model, prompt, temperature, max_tokens):
+    """Yield the text of a single-message chat completion as it is generated (whole text on a cache hit)"""
+    key = hashlib.blake2b(f"{model}\0{prompt}".encode('utf-8'), digest_size=16).digest()
+    content = _LLM_CACHE.get(key)
+    if content is not None:
+        yield content
+        return
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    parts = []
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    if parts:
+        _LLM_CACHE.set(key, ''.join(parts))
+
+def _cached_search(key, fetch):
+    """Azure AI Search result for key, calling fetch() only when no recent non-empty result is cached"""
+    result = _search_cache.get(key)
+    if result is None:
+        result = fetch()
+        if result:
+            _search_cache.set(key, result)
+    return result
+
 def get_db_service():
     """Get database service instance"""
     global db_service
@@ -176,6 +304,24 @@ def build_product_list_with_foc(products, pricing_service):
     
     return product_list
 
+# Product lists with FOC info, keyed by the products they were built from (short TTL so FOC edits show up)
+_product_list_cache = TTLCache(maxsize=8, ttl=60)
+
+def cached_product_list_with_foc(products, pricing_service):
+    """build_product_list_with_foc() for dealer stock dicts, reused while the same stock rows are listed"""
+    if not products or not isinstance(products[0], dict):
+        return build_product_list_with_foc(products, pricing_service)
+    key = tuple(
+        (p.get('product_id') or p.get('id'), p.get('product_code'), p.get('product_name'),
+         p.get('sales_price', p.get('price')), p.get('available_quantity'))
+        for p in products
+    )
+    product_list = _product_list_cache.get(key)
+    if product_list is None:
+        product_list = build_product_list_with_foc(products, pricing_service)
+        _product_list_cache.set(key, product_list)
+    return product_list
+
 def get_llm_service():
     """Get LLM service instance (GroqService)"""
     global llm_service
@@ -357,10 +503,7 @@ def get_default_action_buttons(user):
     # For distributors (dealers), check for pending stocks and add button if needed
     if user and user.role == 'distributor':
         try:
-            stock_service = get_stock_management_service()
-            pending_result = stock_service.get_pending_stock_arrivals(user.unique_id)
-            
-            if pending_result['success'] and pending_result['count'] > 0:
+            if _cached_pending_count(user) > 0:
                 # Add "Pending Stocks" button at the beginning
                 action_buttons.insert(0, {'text': 'Pending Stocks', 'action': 'pending_stocks'})
         except Exception as e:
@@ -368,6 +511,102 @@ def get_default_action_buttons(user):
     
     return action_buttons
 
+def _cached_pending_arrivals(user):
+    """Pending stock arrivals for a dealer, memoized on g for the current request"""
+    if 'pending_arrivals' not in g:
+        g.pending_arrivals = {}
+    key = user.unique_id
+    if key not in g.pending_arrivals:
+        g.pending_arrivals[key] = get_stock_management_service().get_pending_stock_arrivals(key)
+    return g.pending_arrivals[key]
+
+def _load_current_user(user_id):
+    """User for the logged-in user_id, loaded once and kept on g for the rest of the request"""
+    user = g.get('current_user')
+    if user is None or user.id != user_id:
+        user = User.query.get(user_id)
+        g.current_user = user
+    return user
+
+@lru_cache(maxsize=1)
+def _available_tables():
+    """Exportable table metadata for company reports; static for the life of the process"""
+    from app.company_report_service import CompanyReportService
+    return CompanyReportService.get_available_tables()
+
+@lru_cache(maxsize=1)
+def _tax_rate():
+    """Configured cart tax rate (TAX_RATE, default 5%)"""
+    return float(current_app.config.get('TAX_RATE', 0.05))
+
+def _dealer_ids_subquery(area):
+    """SELECT of the distributor unique_ids in an area, for use in dealer_unique_id.in_(...)"""
+    return select(User.unique_id).where(User.role == 'distributor', User.area == area)
+
+def _mr_ids_subquery(area):
+    """SELECT of the MR user ids in an area, for use in Order.mr_id.in_(...)"""
+    return select(User.id).where(User.role == 'mr', User.area == area)
+
+def _cached_pending_count(user):
+    """Number of pending stock arrivals for a dealer, memoized on g for the current request"""
+    pending_arrivals = g.get('pending_arrivals', {}).get(user.unique_id)
+    if pending_arrivals is not None and pending_arrivals['success']:
+        return pending_arrivals['count']
+    if 'pending_counts' not in g:
+        g.pending_counts = {}
+    key = user.unique_id
+    if key not in g.pending_counts:
+        g.pending_counts[key] = get_stock_management_service().count_pending_stock_arrivals(key)
+    elif isinstance(g.pending_counts[key], Future):
+        # Started by _prefetch_pending_count; the count query has been running alongside the caller
+        try:
+            g.pending_counts[key] = g.pending_counts[key].result(timeout=5)
+        except Exception as e:
+            logger.error(f"Error prefetching pending stock count: {str(e)}")
+            g.pending_counts[key] = 0
+    return g.pending_counts[key]
+
+def _prefetch_pending_count(user):
+    """Start counting a dealer's pending stock arrivals on a background thread; _cached_pending_count picks it up"""
+    if 'pending_counts' not in g:
+        g.pending_counts = {}
+    if user.unique_id not in g.pending_counts:
+        app = current_app._get_current_object()
+        g.pending_counts[user.unique_id] = _background_executor.submit(
+            _count_pending_worker, app, user.unique_id
+        )
+
+def _count_pending_worker(app, unique_id):
+    """Count pending stock arrivals outside the request thread"""
+    with app.app_context():
+        return get_stock_management_service().count_pending_stock_arrivals(unique_id)
+
+def _user_language():
+    """User's display language for the current request, read from the session once and kept on g"""
+    user_language = g.get('user_language')
+    if user_language is None:
+        user_language = g.user_language = session.get('user_language', 'en')
+    return user_language
+
+def _tr(text, lang):
+    """Translate English text to lang, memoized per (text, lang)"""
+    if not text or not lang or lang == 'en':
+        return text
+    if not get_translation_service().is_available():
+        return text
+    try:
+        return _tr_cached(text, lang)
+    except LookupError:
+        return text
+
+@lru_cache(maxsize=2048)
+def _tr_cached(text, lang):
+    translated = get_translation_service().translate(text, lang)
+    if translated == text:
+        # Translation failed or was a no-op; don't memoize the fallback
+        raise LookupError(lang)
+    return translated
+
 def translate_response(data: dict, target_language: str = 'en') -> dict:
     """
     Translate response data to target language
@@ -390,16 +629,13 @@ def translate_response(data: dict, target_language: str = 'en') -> dict:
     
     # Translate main response text
     if 'response' in translated_data and isinstance(translated_data['response'], str):
-        translated_data['response'] = translation_service.translate(
-            translated_data['response'], 
-            target_language
-        )
+        translated_data['response'] = _tr(translated_data['response'], target_language)
     
     # Translate action buttons text
     if 'action_buttons' in translated_data and isinstance(translated_data['action_buttons'], list):
         for button in translated_data['action_buttons']:
             if isinstance(button, dict) and 'text' in button:
-                button['text'] = translation_service.translate(button['text'], target_language)
+                button['text'] = _tr(button['text'], target_language)
     
     # Translate error messages
     if 'error' in translated_data and isinstance(translated_data['error'], str):
@@ -435,7 +671,7 @@ def ensure_action_buttons(response_data, user):
     should already have the original English text saved via save_conversation().
     """
     # Get user's language preference from session or request
-    target_language = session.get('user_language', 'en')
+    target_language = _user_language()
     
     # Skip adding default buttons for company users if they already have interactive_report_selection
     if isinstance(response_data, tuple):
@@ -493,10 +729,7 @@ def process_message():
         if not user_message:
             error_msg = 'Message cannot be empty or exceeds maximum length'
             user_language = data.get('language', session.get('user_language', 'en'))
-            if user_language != 'en':
-                translation_service = get_translation_service()
-                if translation_service.is_available():
-                    error_msg = translation_service.translate(error_msg, user_language)
+            error_msg = _tr(error_msg, user_language)
             return jsonify({'error': error_msg}), 400
         
         # Validate and sanitize language
@@ -505,8 +738,9 @@ def process_message():
         if not user_language or user_language not in ['en', 'hi', 'my', 'te']:
             user_language = 'en'  # Default to English if invalid
         
-        # Store user language preference in session
+        # Store user language preference in session (and this request's cache)
         session['user_language'] = user_language
+        g.user_language = user_language
         
         # Enhanced onboarding flow with unique ID
         if 'onboarding_state' not in session:
@@ -522,10 +756,7 @@ def process_message():
             session['onboarding_state'] = 'get_unique_id'
             response_text = 'Hello! Welcome to HV (Powered by Quantum Blue AI). Please enter your unique ID to continue.'
             # Translate welcome message
-            if user_language != 'en':
-                translation_service = get_translation_service()
-                if translation_service.is_available():
-                    response_text = translation_service.translate(response_text, user_language)
+            response_text = _tr(response_text, user_language)
             return jsonify({
                 'response': response_text
             }), 200
@@ -540,10 +771,7 @@ def process_message():
             # validate_unique_id returns boolean, so we check it and use the raw value if valid
             if not validate_unique_id(unique_id_raw):
                 response_text = 'Please enter a valid unique ID.'
-                if user_language != 'en':
-                    translation_service = get_translation_service()
-                    if translation_service.is_available():
-                        response_text = translation_service.translate(response_text, user_language)
+                response_text = _tr(response_text, user_language)
                 return jsonify({'response': response_text}), 200
             
             # Use the validated raw value (not the boolean return)
@@ -553,20 +781,14 @@ def process_message():
             
             if not user:
                 response_text = 'Unique ID not found. Please check your ID and try again, or contact support for assistance.'
-                if user_language != 'en':
-                    translation_service = get_translation_service()
-                    if translation_service.is_available():
-                        response_text = translation_service.translate(response_text, user_language)
+                response_text = _tr(response_text, user_language)
                 return jsonify({
                     'response': response_text
                 }), 200
             
             if not user.is_active:
                 response_text = 'Your account is inactive. Please contact support for assistance.'
-                if user_language != 'en':
-                    translation_service = get_translation_service()
-                    if translation_service.is_available():
-                        response_text = translation_service.translate(response_text, user_language)
+                response_text = _tr(response_text, user_language)
                 return jsonify({
                     'response': response_text
                 }), 200
@@ -578,6 +800,10 @@ def process_message():
             session['area'] = user.area  # Use area instead of nearest_warehouse
             session['onboarding_state'] = 'ask_intent'
             
+            # Distributors' welcome shows their pending stock count; run that query while the chat session is created
+            if user.role == 'distributor':
+                _prefetch_pending_count(user)
+            
             # Create chat session
             chat_session = db_service.create_chat_session(user.id)
             session['session_id'] = chat_session.session_id
@@ -595,10 +821,7 @@ def process_message():
                 full_message = f"{welcome_message}\n\nPlease select an option below:"
             
             # Translate welcome message if needed
-            if user_language != 'en':
-                translation_service = get_translation_service()
-                if translation_service.is_available():
-                    full_message = translation_service.translate(full_message, user_language)
+            full_message = _tr(full_message, user_language)
             
             return ensure_action_buttons(jsonify({
                 'response': full_message,
@@ -615,7 +838,7 @@ def process_message():
         if state == 'ask_intent':
             # Use LLM to understand what user wants to do
             db_service = get_db_service()
-            user = User.query.get(session.get('user_id'))
+            user = _load_current_user(session.get('user_id'))
             
             llm_service = get_llm_service()
             if llm_service and llm_service.client:
@@ -675,7 +898,7 @@ Respond with ONLY a JSON object:
                         return handle_place_order(user_message, user, context_data, conv_history)
                     elif detected_intent == 'TRACK_ORDER':
                         # Call handle_track_order directly to show orders table and selection box
-                        return handle_track_order(user_message, user, context_data)
+                        return _emit_listing(handle_track_order(user_message, user, context_data))
                     elif detected_intent == 'PRODUCT_INFO':
                         # Redirect to handle_product_info_or_query for consistent table display
                         return handle_product_info_or_query(user_message, user, context_data)
@@ -720,7 +943,7 @@ Respond with ONLY a JSON object:
                     # Initialize context_data if not already created
                     context_data = {}
                     # Call handle_track_order directly to show orders table and selection box
-                    return handle_track_order(user_message, user, context_data)
+                    return _emit_listing(handle_track_order(user_message, user, context_data))
                 else:
                     session['user_intent'] = 'OTHER'
 
@@ -739,7 +962,7 @@ Respond with ONLY a JSON object:
         pricing_service = get_pricing_service()
 
         # Get user context
-        user = User.query.get(session_user_id)
+        user = _load_current_user(session_user_id)
         
         # COMPANY USER FLOW - Handle report generation requests
         if user and user.role == 'company':
@@ -778,9 +1001,8 @@ Respond with ONLY a JSON object:
         if message_lower in greeting_keywords or any(message_lower.startswith(g) for g in greeting_keywords):
             logger.info(f"Detected greeting message: {user_message}")
             # Check if user has items in cart
-            cart_items = db_service.get_cart_items(session_user_id)
-            if cart_items:
-                cart_count = len(cart_items)
+            _, cart_count = db_service.get_cart_totals(session_user_id)
+            if cart_count:
                 greeting_response = f"Hello! 👋 You currently have {cart_count} item(s) in your cart. Would you like to:\n• Add more products\n• View your cart\n• Confirm and place your order"
                 save_conversation(user.id, user_message, greeting_response)
                 return jsonify({
@@ -827,6 +1049,7 @@ Respond with ONLY a JSON object:
             # Clear the current selected customer from session
             session.pop('selected_customer_id', None)
             session.pop('selected_customer_unique_id', None)
+            session.pop('selected_customer_name', None)
             return handle_select_customer(user, context_data)
         elif any(pattern in message_lower_clean for pattern in add_customer_patterns):
             logger.info(f"Detected add new customer message: {user_message}")
@@ -979,8 +1202,8 @@ Respond with ONLY a JSON object:
         # Check for "confirm cart" message - show Edit Cart / Place Order options
         message_lower = user_message.lower().strip()
         if message_lower in ['confirm cart', 'confirm my cart', 'cart confirmed']:
-            cart_items = db_service.get_cart_items(session_user_id)
-            if not cart_items:
+            total, cart_count = db_service.get_cart_totals(session_user_id)
+            if not cart_count:
                 response = "Your cart is empty. Please add some products to your cart first."
                 save_conversation(user.id, user_message, response)
                 return jsonify({
@@ -990,9 +1213,7 @@ Respond with ONLY a JSON object:
                     ]
                 }), 200
             
-            # Calculate cart total
-            total = sum(item.total_price for item in cart_items)
-            response = f"Your cart has been confirmed! You have {len(cart_items)} item(s) in your cart with a total of ${total:,.2f}.\n\nWhat would you like to do next?"
+            response = f"Your cart has been confirmed! You have {cart_count} item(s) in your cart with a total of ${total:,.2f}.\n\nWhat would you like to do next?"
             save_conversation(user.id, user_message, response)
             return jsonify({
                 'response': response,
@@ -1063,7 +1284,7 @@ Respond with ONLY a JSON object:
         if message_lower in track_order_keywords or ('track' in message_lower and 'order' in message_lower):
             logger.info(f"Detected track order message: {user_message}")
             # context_data is already initialized above
-            return handle_track_order(user_message, user, context_data)
+            return _emit_listing(handle_track_order(user_message, user, context_data))
         
         # Check for "add to cart" messages BEFORE intent classification
         # This handles messages like "add 3 BD-20008 to cart" or "add 3 BD-20008 (Product Name) to cart" from the product selection form
@@ -1092,7 +1313,7 @@ Respond with ONLY a JSON object:
                 # Try direct processing first (bypass LLM for simple "add X CODE to cart" format)
                 try:
                     # Get user and product
-                    user = User.query.get(session_user_id)
+                    user = _load_current_user(session_user_id)
                     if not user:
                         return jsonify({'error': 'User not found'}), 401
                     
@@ -1338,13 +1559,17 @@ Respond with ONLY a JSON object:
             # Extract response data if it's a tuple (jsonify response)
             if isinstance(response, tuple):
                 response_obj, status_code = response
+                if isinstance(response_obj, dict):
+                    # Plain dict from an order listing; serialized once here
+                    response_obj['intent'] = intent
+                    return _emit_listing((translate_response(response_obj, user_language), status_code))
                 if hasattr(response_obj, 'get_json'):
                     data = response_obj.get_json()
                     if data:
                         data['intent'] = intent
                         # Translate response before returning
                         data = translate_response(data, user_language)
-                        return jsonify(data), status_code
+                        return fast_jsonify(data), status_code
             elif isinstance(response, dict):
                 response['intent'] = intent
                 return response
@@ -1353,7 +1578,7 @@ Respond with ONLY a JSON object:
 
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
-        user = User.query.get(session.get('user_id')) if session.get('user_id') else None
+        user = _load_current_user(session.get('user_id')) if session.get('user_id') else None
         return ensure_action_buttons(jsonify({'response': 'Sorry, I encountered an error. Please try again.'}), user), 500
 
 def handle_order_confirmation(user, user_id):
@@ -1407,7 +1632,7 @@ def handle_order_confirmation(user, user_id):
             
     except Exception as e:
         logger.error(f"Error handling order confirmation: {str(e)}")
-        user = User.query.get(user_id) if user_id else None
+        user = _load_current_user(user_id) if user_id else None
         return ensure_action_buttons(jsonify({'response': 'Sorry, I encountered an error placing your order. Please try again.'}), user), 500
 
 def handle_place_order(user_message, user, context_data, conversation_history):
@@ -1477,12 +1702,8 @@ def handle_place_order(user_message, user, context_data, conversation_history):
             products = db_service.get_products_from_dealer_stock(user.area)
         else:
             # Fallback: use Product table only if no area or not MR/distributor
-            warehouse = db_service.get_warehouse_by_area(user.area) if user.area else None
-            if warehouse:
-                products = db_service.get_products_by_warehouse(warehouse.id)
-            else:
-                from app.models import Product
-                products = Product.query.all()
+            from app.models import Product
+            products = Product.query.all()
         
         if not products:
             response = "No products are currently available in your area. Please contact support."
@@ -1528,6 +1749,85 @@ def handle_place_order(user_message, user, context_data, conversation_history):
         logger.error(f"Error handling place order: {str(e)}")
         return ensure_action_buttons(jsonify({'response': 'Sorry, I encountered an error processing your order. Please try again.'}), user), 500
 
+# Order status keywords recognised in track-order messages
+_STATUS_FILTER_RE = re.compile(r'\b(pending|confirmed|in[_ -]?transit|transit|shipped|delivered)\b')
+_STATUS_FILTERS = {
+    'confirmed': (['confirmed', 'distributor_confirmed'], "confirmed orders"),
+    'transit': (['in_transit', 'distributor_notified'], "in-transit orders"),
+    'shipped': (['shipped'], "shipped orders"),
+    'delivered': (['delivered'], "delivered orders"),
+}
+
+# Order listing statements are built once and reused; only the bind values change per request
+_MrUser, _CreatorUser, _PartnerUser = aliased(User), aliased(User), aliased(User)
+_AREA_ORDERS_STMT = select(
+    Order.id, Order.order_id, Order.status, Order.total_amount, Order.created_at,
+    Order.mr_unique_id, Order.customer_unique_id, Order.created_by_id,
+    _MrUser.name.label('mr_name'), _MrUser.area.label('mr_area'), _MrUser.unique_id.label('mr_user_unique_id'),
+    _CreatorUser.id.label('creator_id'), _CreatorUser.name.label('creator_name'),
+    _CreatorUser.role.label('creator_role'), _CreatorUser.unique_id.label('creator_unique_id'),
+    Customer.name.label('customer_name'),
+    _PartnerUser.name.label('delivery_partner_name')
+).select_from(Order).join(
+    _MrUser, Order.mr_id == _MrUser.id
+).outerjoin(
+    _CreatorUser, Order.created_by_id == _CreatorUser.id
+).outerjoin(
+    Customer, Order.customer_id == Customer.id
+).outerjoin(
+    _PartnerUser, Order.delivery_partner_id == _PartnerUser.id
+).where(
+    _MrUser.area == bindparam('area')
+).order_by(Order.created_at.desc()).limit(50)
+
+_MR_ORDERS_STMT = select(
+    Order.order_id, Order.status, Order.order_stage, Order.total_amount, Order.created_at,
+    Customer.id.label('customer_pk'), Customer.name.label('customer_name'), Customer.unique_id.label('customer_unique_id')
+).select_from(Order).outerjoin(
+    Customer, Order.customer_id == Customer.id
+).where(
+    Order.mr_id == bindparam('mr_id')
+).order_by(Order.created_at.desc()).limit(50)
+
+def _order_date_expression():
+    """SQL expression for the calendar date of Order.created_at"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.date(Order.created_at)
+    return cast(Order.created_at, Date)
+
+def _distinct_order_dates(query):
+    """Distinct order dates (YYYY-MM-DD, newest first) for an Order query"""
+    date_expr = _order_date_expression()
+    rows = query.with_entities(date_expr).filter(Order.created_at.isnot(None)).distinct().all()
+    dates = {d if isinstance(d, str) else d.strftime('%Y-%m-%d') for (d,) in rows if d}
+    return sorted(dates, reverse=True)
+
+def _parse_iso_datetime(value):
+    """Parse an ISO-8601 timestamp, accepting a trailing 'Z' for UTC"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return _parse_iso(value)
+
+_OrderItemRow = namedtuple('_OrderItemRow', 'name code qty_display unit_price total_price')
+
+def _normalize_order_item(item):
+    """Normalize an order item dict from get_order_status into a table row"""
+    get = item.get
+    # Handle different quantity field names; free quantity is optional
+    quantity = get('quantity') or get('product_quantity_ordered') or 0
+    free_quantity = get('free_quantity') or 0
+    if free_quantity > 0:
+        qty_display = f"{quantity} + {free_quantity} free = {quantity + free_quantity}"
+    else:
+        qty_display = str(quantity)
+    return _OrderItemRow(
+        get('product_name') or get('product_code', 'Unknown'),
+        get('product_code', 'N/A'),
+        qty_display,
+        float(get('unit_price') or 0),
+        float(get('total_price') or 0)
+    )
+
 def handle_track_order(user_message, user, context_data=None):
     """Handle track order requests. context_data is optional."""
     if context_data is None:
@@ -1727,10 +2027,11 @@ def handle_track_order(user_message, user, context_data=None):
                 status_filter = None
                 filter_description = "all orders"
                 
-                # Detect status filter in message
+                # Detect status filter in message (single scan, keyword priority kept by _STATUS_FILTERS order)
                 # Note: "pending orders" (out-of-stock orders) is different from "pending stocks" (stock arrivals to confirm)
                 # This handler only shows out-of-stock orders, not stock arrivals
-                if 'pending' in message_lower and 'stock' not in message_lower:
+                status_keywords = {'transit' if 'transit' in kw else kw for kw in _STATUS_FILTER_RE.findall(message_lower)}
+                if 'pending' in status_keywords and 'stock' not in message_lower:
                     # Special handling for pending orders - show PendingOrderProducts (out-of-stock orders)
                     pending_items = db_service.get_pending_order_products(area=user.area, status='pending')
                     if not pending_items:
@@ -1746,99 +2047,100 @@ def handle_track_order(user_message, user, context_data=None):
                         summary += f"| {item.product_code} | {item.product_name} | {item.requested_quantity} | {customer_name} | {order_ref} | {item.created_at.strftime('%Y-%m-%d')} |\n"
                     summary += '\n**Note:** These products are waiting for stock to arrive. They will be automatically ordered when available.'
                     return ensure_action_buttons(jsonify({'response': summary}), user), 200
-                elif 'confirmed' in message_lower:
-                    status_filter = ['confirmed', 'distributor_confirmed']
-                    filter_description = "confirmed orders"
-                elif 'in transit' in message_lower or 'transit' in message_lower:
-                    status_filter = ['in_transit', 'distributor_notified']
-                    filter_description = "in-transit orders"
-                elif 'shipped' in message_lower:
-                    status_filter = ['shipped']
-                    filter_description = "shipped orders"
-                elif 'delivered' in message_lower:
-                    status_filter = ['delivered']
-                    filter_description = "delivered orders"
+                else:
+                    for keyword, (statuses, description) in _STATUS_FILTERS.items():
+                        if keyword in status_keywords:
+                            status_filter = statuses
+                            filter_description = description
+                            break
                 
-                # Get all orders for distributor's area
-                # Get orders from distributor's area
-                orders = Order.query.join(User, Order.mr_id == User.id).filter(
+                # Get latest orders from distributor's area
+                area_orders_query = Order.query.join(User, Order.mr_id == User.id).filter(
                     User.area == user.area
-                ).order_by(Order.created_at.desc()).all()
+                )
+                # Only the listed columns are needed; the statement is prebuilt at module level
+                orders = db.session.execute(_AREA_ORDERS_STMT, {'area': user.area}).all()  # Show latest 50 orders
                 
                 if not orders:
                     return ensure_action_buttons(jsonify({'response': 'No orders found in your area.'}), user), 200
                 
+                # Filters cover every order in the area; let the database compute the distinct values
+                creator_rows = area_orders_query.with_entities(Order.created_by_id, Order.mr_id).distinct().all()
+                creator_ids = {creator_id for r in creator_rows if (creator_id := r.created_by_id or r.mr_id)}
+                creators_by_id = {u.id: u for u in User.query.filter(User.id.in_(creator_ids)).all()} if creator_ids else {}
+                
                 # Get unique order creators (MRs and Dealers), statuses, and dates for filters
                 unique_creators = []
                 seen_creators = set()
-                for o in orders:
+                for r in creator_rows:
                     placed_by = None
-                    if o.created_by_id:
-                        created_by = User.query.get(o.created_by_id)
+                    if r.created_by_id:
+                        created_by = creators_by_id.get(r.created_by_id)
                         if created_by:
                             role_display = 'Dealer' if created_by.role == 'distributor' else created_by.role.upper()
                             placed_by = f"{role_display}: {created_by.name}"
-                    elif o.mr:
-                        placed_by = f"MR: {o.mr.name}"
+                    elif r.mr_id and r.mr_id in creators_by_id:
+                        placed_by = f"MR: {creators_by_id[r.mr_id].name}"
                     
                     if placed_by and placed_by not in seen_creators:
                         unique_creators.append(placed_by)
                         seen_creators.add(placed_by)
                 
                 unique_mrs = sorted(unique_creators)
-                unique_statuses = sorted(list(set([o.status for o in orders if o.status])))
-                unique_dates = sorted(list(set([o.created_at.strftime('%Y-%m-%d') for o in orders if o.created_at])), reverse=True)
+                unique_statuses = sorted([st for (st,) in area_orders_query.with_entities(Order.status).filter(Order.status.isnot(None)).distinct().all()])
+                unique_dates = _distinct_order_dates(area_orders_query)
+                
+                # Count items for the displayed orders in a single grouped query
+                order_ids = [o.id for o in orders]
+                items_counts = dict(
+                    db.session.query(OrderItem.order_id, func.count(OrderItem.id))
+                    .filter(OrderItem.order_id.in_(order_ids))
+                    .group_by(OrderItem.order_id)
+                    .all()
+                ) if order_ids else {}
                 
                 # Build orders list with details
                 orders_data = []
-                for o in orders[:50]:  # Show latest 50 orders
+                for o in orders:
                     # Get placed_by information
                     placed_by_display = 'N/A'
                     placed_by_role = None
                     created_by_unique_id = None
                     
                     if o.created_by_id:
-                        created_by = User.query.get(o.created_by_id)
-                        if created_by:
-                            role_display = 'Dealer' if created_by.role == 'distributor' else created_by.role.upper()
-                            placed_by_display = f"{role_display}: {created_by.name}"
-                            placed_by_role = created_by.role
-                            created_by_unique_id = created_by.unique_id
-                    elif o.mr:
-                        placed_by_display = f"MR: {o.mr.name}"
+                        if o.creator_id:
+                            role_display = 'Dealer' if o.creator_role == 'distributor' else o.creator_role.upper()
+                            placed_by_display = f"{role_display}: {o.creator_name}"
+                            placed_by_role = o.creator_role
+                            created_by_unique_id = o.creator_unique_id
+                    else:
+                        placed_by_display = f"MR: {o.mr_name}"
                         placed_by_role = 'mr'
-                        created_by_unique_id = o.mr.unique_id
-                    
-                    # Get customer name
-                    customer_name = 'N/A'
-                    if o.customer:
-                        customer_name = o.customer.name
+                        created_by_unique_id = o.mr_user_unique_id
                     
-                    # Get delivery partner name
-                    delivery_partner_name = 'Not Assigned'
-                    if o.delivery_partner:
-                        delivery_partner_name = o.delivery_partner.name
+                    # One strftime per order; date and time are slices of it
+                    order_datetime = o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else None
                     
                     orders_data.append({
                         'order_id': o.order_id,
-                        'mr_name': o.mr.name if o.mr else 'N/A',
+                        'mr_name': o.mr_name,
                         'mr_id': o.mr_unique_id if o.mr_unique_id else 'N/A',
                         'mr_unique_id': o.mr_unique_id,
                         'created_by_unique_id': created_by_unique_id,
                         'placed_by_display': placed_by_display,
                         'placed_by_role': placed_by_role,
-                        'customer_name': customer_name,
+                        'customer_name': o.customer_name if o.customer_name is not None else 'N/A',
                         'customer_id': o.customer_unique_id if o.customer_unique_id else 'N/A',
-                        'delivery_partner_name': delivery_partner_name,
+                        'delivery_partner_name': o.delivery_partner_name if o.delivery_partner_name is not None else 'Not Assigned',
                         'status': o.status,
                         'status_display': o.status.replace('_', ' ').title() if o.status else 'Unknown',
                         'total_amount': float(o.total_amount) if o.total_amount else 0.0,
-                        'order_date': o.created_at.strftime('%Y-%m-%d') if o.created_at else 'N/A',
-                        'order_time': o.created_at.strftime('%H:%M') if o.created_at else 'N/A',
-                        'order_datetime': o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else 'N/A',
-                        'area': o.mr.area if o.mr else 'N/A',
+                        'order_date': order_datetime[:10] if order_datetime else 'N/A',
+                        'order_time': order_datetime[11:] if order_datetime else 'N/A',
+                        'order_datetime': order_datetime or 'N/A',
+                        'area': o.mr_area,
                         'can_confirm': o.status == 'pending',
-                        'items_count': o.order_items.count() if hasattr(o.order_items, 'count') else 0
+                        'items_count': items_counts.get(o.id, 0)
                     })
                 
                 # Return selection box for distributors
@@ -1855,14 +2157,10 @@ def handle_track_order(user_message, user, context_data=None):
                 save_conversation(user.id, user_message, response_msg_en)
                 
                 # Translate for user if needed
-                user_language = session.get('user_language', 'en')
-                response_msg = response_msg_en
-                if user_language != 'en':
-                    translation_service = get_translation_service()
-                    if translation_service.is_available():
-                        response_msg = translation_service.translate(response_msg_en, user_language)
+                user_language = _user_language()
+                response_msg = _tr(response_msg_en, user_language)
                 
-                return ensure_action_buttons(jsonify({
+                return ensure_action_buttons({
                     'response': response_msg,
                     'interactive_order_selection': True,  # Flag for frontend to show selection box
                     'order_selection_type': 'distributor',  # Type of selection
@@ -1873,31 +2171,16 @@ def handle_track_order(user_message, user, context_data=None):
                         'statuses': unique_statuses,
                         'dates': unique_dates
                     }
-                }), user), 200
+                }, user), 200
         # fall back to self-tracking for non-distributors
         if order_id:
             status = enhanced_order_service.get_order_status(order_id, user.id)
             if status['success']:
                 # Build order details table
-                table = '| Product | Quantity | Unit Price | Total |\n|--------|----------|-----------|-------|\n'
-                for i in status['order']['items']:
-                    # Get quantity (handle different field names)
-                    quantity = i.get('quantity') or i.get('product_quantity_ordered') or 0
-                    # Get free quantity if available
-                    free_quantity = i.get('free_quantity', 0)
-                    # Format quantity display
-                    if free_quantity and free_quantity > 0:
-                        qty_display = f"{quantity} + {free_quantity} free = {quantity + free_quantity}"
-                    else:
-                        qty_display = str(quantity) if quantity else '0'
-                    
-                    # Build table row with safe field access
-                    product_name = i.get('product_name') or i.get('product_code', 'Unknown')
-                    product_code = i.get('product_code', 'N/A')
-                    unit_price = float(i.get('unit_price', 0)) if i.get('unit_price') else 0.0
-                    total_price = float(i.get('total_price', 0)) if i.get('total_price') else 0.0
-                    
-                    table += f"| {product_name} | {qty_display} | {unit_price:,.2f} MMK | {total_price:,.2f} MMK |\n"
+                table_rows = ['| Product | Quantity | Unit Price | Total |\n|--------|----------|-----------|-------|\n']
+                for it in map(_normalize_order_item, status['order']['items']):
+                    table_rows.append(f"| {it.name} | {it.qty_display} | {it.unit_price:,.2f} MMK | {it.total_price:,.2f} MMK |\n")
+                table = ''.join(table_rows)
                 
                 # Format status display
                 status_display = status['order']['status'].replace('_', ' ').title()
@@ -1909,13 +2192,16 @@ def handle_track_order(user_message, user, context_data=None):
                 msg += f"• **Status:** {status_display}\n"
                 if order_stage_display:
                     msg += f"• **Order Stage:** {order_stage_display}\n"
-                if status['order'].get('order_date'):
-                    from datetime import datetime
+                order_date_raw = status['order'].get('order_date')
+                if order_date_raw:
                     try:
-                        order_date = datetime.fromisoformat(status['order']['order_date'].replace('Z', '+00:00'))
+                        order_date = _parse_iso_datetime(order_date_raw)
+                    except (TypeError, ValueError):
+                        order_date = None
+                    if order_date:
                         msg += f"• **Order Date:** {order_date.strftime('%B %d, %Y at %I:%M %p')}\n"
-                    except:
-                        msg += f"• **Order Date:** {status['order']['order_date']}\n"
+                    else:
+                        msg += f"• **Order Date:** {order_date_raw}\n"
                 
                 msg += f"\n{table}\n"
                 
@@ -1946,30 +2232,31 @@ def handle_track_order(user_message, user, context_data=None):
         # Get orders by mr_id (for MRs)
         if user.role == 'mr':
             # For MRs, get orders where they are the MR
-            orders = Order.query.filter(
-                Order.mr_id == user.id
-            ).order_by(Order.created_at.desc()).all()
+            mr_orders_query = Order.query.filter(Order.mr_id == user.id)
+            orders = db.session.execute(_MR_ORDERS_STMT, {'mr_id': user.id}).all()  # Show up to 50 recent orders
+            
+            # Filters cover every order of the MR; let the database compute the distinct values
+            total_orders = mr_orders_query.count()
             
             # Get unique customers, statuses, and dates for filters
-            unique_customers = []
-            unique_statuses = sorted(list(set([o.status for o in orders if o.status])))
-            unique_dates = sorted(list(set([o.created_at.strftime('%Y-%m-%d') for o in orders if o.created_at])), reverse=True)
+            unique_statuses = sorted([st for (st,) in mr_orders_query.with_entities(Order.status).filter(Order.status.isnot(None)).distinct().all()])
+            unique_dates = _distinct_order_dates(mr_orders_query)
             
-            # Get unique customers from orders
-            customer_ids = set([o.customer_id for o in orders if o.customer_id])
-            from app.models import Customer
-            customers = Customer.query.filter(Customer.id.in_(customer_ids)).all() if customer_ids else []
-            unique_customers = sorted([f"{c.name} ({c.unique_id})" for c in customers])
+            # Get unique customers from orders (DISTINCT + ORDER BY in SQL, backed by ix_orders_mr_id_customer_id)
+            customer_rows = db.session.query(Customer.name, Customer.unique_id).join(
+                Order, Order.customer_id == Customer.id
+            ).filter(Order.mr_id == user.id).distinct().order_by(Customer.name, Customer.unique_id).all()
+            unique_customers = [f"{name} ({unique_id})" for name, unique_id in customer_rows]
             
             # Prepare orders data for frontend display with customer info
             orders_list = []
-            for o in orders[:50]:  # Show up to 50 recent orders
+            for o in orders:
                 status_display = (o.status or o.order_stage or 'Unknown').replace('_', ' ').title()
                 customer_name = 'N/A'
                 customer_id = None
-                if o.customer:
-                    customer_name = f"{o.customer.name} ({o.customer.unique_id})"
-                    customer_id = o.customer.unique_id
+                if o.customer_pk:
+                    customer_name = f"{o.customer_name} ({o.customer_unique_id})"
+                    customer_id = o.customer_unique_id
                 
                 orders_list.append({
                     'order_id': o.order_id,
@@ -1984,7 +2271,7 @@ def handle_track_order(user_message, user, context_data=None):
             # Return response with orders data and filters for interactive display (NO MR filter for MR users)
             # Build response in English first (for database)
             response_msg_en = f"**📊 Your Orders**\n\n"
-            response_msg_en += f"Found **{len(orders)}** order(s) in total.\n\n"
+            response_msg_en += f"Found **{total_orders}** order(s) in total.\n\n"
             response_msg_en += "**Use the filters below to narrow down your search:**\n"
             response_msg_en += "• Filter by Customer\n"
             response_msg_en += "• Filter by Status\n"
@@ -1995,14 +2282,10 @@ def handle_track_order(user_message, user, context_data=None):
             save_conversation(user.id, user_message, response_msg_en)
             
             # Translate for user if needed
-            user_language = session.get('user_language', 'en')
-            response_msg = response_msg_en
-            if user_language != 'en':
-                translation_service = get_translation_service()
-                if translation_service.is_available():
-                    response_msg = translation_service.translate(response_msg_en, user_language)
+            user_language = _user_language()
+            response_msg = _tr(response_msg_en, user_language)
             
-            return jsonify({
+            return {
                 'response': response_msg,
                 'show_orders_table': True,
                 'orders': orders_list,
@@ -2015,7 +2298,7 @@ def handle_track_order(user_message, user, context_data=None):
                     # Note: No 'mr_names' filter for MR users - they only see their own orders
                 },
                 'action_buttons': []  # Prevent showing action buttons when order selection is active
-            }), 200
+            }, 200
         else:
             # For other users, get orders by user_id
             orders = db_service.get_orders_by_user(user.id)
@@ -2039,17 +2322,13 @@ def handle_track_order(user_message, user, context_data=None):
         # Build response in English first
         response_text_en = 'Here are your recent orders. Select an order to view details:'
         
-        # Translate for user if needed
-        user_language = session.get('user_language', 'en')
-        response_text = response_text_en
-        if user_language != 'en':
-            translation_service = get_translation_service()
-            if translation_service.is_available():
-                response_text = translation_service.translate(response_text_en, user_language)
-        
-        # Save English version to database
+        # Save English version to database (buffered; written at request teardown)
         save_conversation(user.id, user_message, response_text_en)
         
+        # Translate for user if needed
+        user_language = _user_language()
+        response_text = _tr(response_text_en, user_language)
+        
         return ensure_action_buttons(jsonify({
             'response': response_text,
             'show_orders_table': True,
@@ -2100,57 +2379,104 @@ def handle_calculate_cost(user_message, user, context_data, conversation_history
         logger.error(f"Error handling calculate cost: {str(e)}")
         return ensure_action_buttons(jsonify({'response': 'Sorry, I encountered an error calculating the cost. Please try again.'}), user), 500
 
+def _build_company_info_text():
+    """Build the static company info message (English)"""
+    # Use default company info for Quantum Blue AI
+    company_info = {
+        'company_name': 'Quantum Blue AI',
+        'description': 'Your intelligent assistant for orders, tracking, and more!',
+        'features': [
+            'Order Management',
+            'Order Tracking',
+            'Product Information',
+            'Customer Management',
+            'Stock Management'
+        ],
+        'contact_info': {
+            'email': 'info@quantumblue.ai',
+            'phone': '+1-800-QUANTUM',
+            'address': 'Quantum Blue AI Headquarters'
+        }
+    }
+    
+    response = f"Welcome to {company_info['company_name']}!\n\n"
+    response += f"{company_info['description']}\n\n"
+    response += "Our features include:\n"
+    for feature in company_info['features']:
+        response += f"• {feature}\n"
+    
+    response += f"\nContact Information:\n"
+    response += f"Email: {company_info['contact_info']['email']}\n"
+    response += f"Phone: {company_info['contact_info']['phone']}\n"
+    response += f"Address: {company_info['contact_info']['address']}\n"
+    return response
+
+# Company info is constant; build it once at import
+_COMPANY_INFO_EN = _build_company_info_text()
+_COMPANY_INFO_BUTTONS = (
+    {'text': 'Place Order', 'action': 'place_order'},
+    {'text': 'View Open Order', 'action': 'open_order'},
+    {'text': 'Company Info', 'action': 'company_info'}
+)
+
 def handle_company_info(user_message, user):
     """Handle company information requests"""
     try:
-        # Use default company info for Quantum Blue AI
-        company_info = {
-            'company_name': 'Quantum Blue AI',
-            'description': 'Your intelligent assistant for orders, tracking, and more!',
-            'features': [
-                'Order Management',
-                'Order Tracking',
-                'Product Information',
-                'Customer Management',
-                'Stock Management'
-            ],
-            'contact_info': {
-                'email': 'info@quantumblue.ai',
-                'phone': '+1-800-QUANTUM',
-                'address': 'Quantum Blue AI Headquarters'
-            }
-        }
-        
-        response = f"Welcome to {company_info['company_name']}!\n\n"
-        response += f"{company_info['description']}\n\n"
-        response += "Our features include:\n"
-        for feature in company_info['features']:
-            response += f"• {feature}\n"
-        
-        response += f"\nContact Information:\n"
-        response += f"Email: {company_info['contact_info']['email']}\n"
-        response += f"Phone: {company_info['contact_info']['phone']}\n"
-        response += f"Address: {company_info['contact_info']['address']}\n"
-        
-        save_conversation(user.id, user_message, response)
+        # Translation for the user happens in process_message via translate_response (memoized by _tr)
+        save_conversation(user.id, user_message, _COMPANY_INFO_EN)
         return jsonify({
-            'response': response,
-            'action_buttons': [
-                {'text': 'Place Order', 'action': 'place_order'},
-                {'text': 'View Open Order', 'action': 'open_order'},
-                {'text': 'Company Info', 'action': 'company_info'}
-            ]
+            'response': _COMPANY_INFO_EN,
+            'action_buttons': [dict(button) for button in _COMPANY_INFO_BUTTONS]
         }), 200
         
     except Exception as e:
         logger.error(f"Error handling company info: {str(e)}")
         return ensure_action_buttons(jsonify({'response': 'Sorry, I encountered an error retrieving company information.'}), user), 500
 
+@ttl_cached(ttl=60, maxsize=4, cache_if=bool)
+def _get_product_info_list():
+    """Product selection list for Product Info, shaped from Azure AI Search (cached for 60s)"""
+    products = get_search_service().get_all_products(top=100)
+    product_list = []
+    for product in products:
+        # Extract product name from various possible fields
+        product_name = product.get('product_name') or product.get('name') or product.get('title') or 'Unknown Product'
+        product_list.append({
+            'id': product.get('id') or product.get('product_id') or product_name,
+            'name': product_name,
+            'description': product.get('description') or product.get('content') or product.get('text') or ''
+        })
+    return product_list
+
+def _product_row_from_dict(product):
+    """Product table row from a dealer stock dict"""
+    price = product.get('sales_price', product.get('price', 0))
+    available = product.get('available_quantity', 0)
+    return {
+        'product_name': product.get('product_name', ''),
+        'product_code': product.get('product_code', ''),
+        'sales_price': float(price) if price else 0.0,
+        'available_for_sale': int(available) if available else 0
+    }
+
+def _product_row_from_orm(product):
+    """Product table row from a Product object or (id, product_name, price) row"""
+    price = getattr(product, 'sales_price', None) or product.price
+    return {
+        'product_name': product.product_name,
+        'product_code': str(product.id),
+        'sales_price': float(price) if price else 0.0,
+        'available_for_sale': 0  # Will be in dealer stock
+    }
+
+# Maximum catalog rows listed when a user has no dealer stock to list from
+PRODUCT_FALLBACK_LIMIT = 200
+
 def handle_product_info_or_query(user_message, user, context_data):
     """Handle product information and database queries"""
     # Get user language at the start of the function
     try:
-        user_language = session.get('user_language', 'en')
+        user_language = _user_language()
     except:
         user_language = 'en'
     
@@ -2175,17 +2501,7 @@ def handle_product_info_or_query(user_message, user, context_data):
             
             # Get all available products for the selection list
             try:
-                products = search_service.get_all_products(top=100)
-                product_list = []
-                for product in products:
-                    # Extract product name from various possible fields
-                    product_name = product.get('product_name') or product.get('name') or product.get('title') or 'Unknown Product'
-                    product_list.append({
-                        'id': product.get('id') or product.get('product_id') or product_name,
-                        'name': product_name,
-                        'description': product.get('description') or product.get('content') or product.get('text') or ''
-                    })
-                
+                product_list = _get_product_info_list()
                 logger.info(f"Product Info: Retrieved {len(product_list)} products for user {user.id}")
             except Exception as e:
                 logger.error(f"Error retrieving products for Product Info: {str(e)}")
@@ -2194,10 +2510,7 @@ def handle_product_info_or_query(user_message, user, context_data):
             save_conversation(user.id, user_message, "Product Info search interface opened")
             response_text = '🔍 **Product Information Search**\n\nPlease use the search interface below to find product information. You can search by product name or browse the available products.'
             # Translate response (user_language already defined at function start)
-            if user_language != 'en':
-                translation_service = get_translation_service()
-                if translation_service.is_available():
-                    response_text = translation_service.translate(response_text, user_language)
+            response_text = _tr(response_text, user_language)
             
             return ensure_action_buttons(jsonify({
                 'response': response_text,
@@ -2213,10 +2526,7 @@ def handle_product_info_or_query(user_message, user, context_data):
             logger.error(f"Error retrieving products from Azure Search: {str(e)}")
             response = f"Product Info feature is temporarily unavailable. Error: {str(e)}"
             # Translate error message (user_language already defined at function start)
-            if user_language != 'en':
-                translation_service = get_translation_service()
-                if translation_service.is_available():
-                    response = translation_service.translate(response, user_language)
+            response = _tr(response, user_language)
             save_conversation(user.id, user_message, response)
             return ensure_action_buttons(jsonify({
                     'response': response,
@@ -2273,14 +2583,10 @@ def handle_product_info_or_query(user_message, user, context_data):
             # For distributors, get products from dealer_wise_stock_details (their own stock)
             products = db_service.get_products_from_dealer_stock(user.area)
         else:
-            # Fallback: use Product table only if no area or not MR/distributor
-            warehouse = db_service.get_warehouse_by_area(user.area) if user.area else None
-            if warehouse:
-                products = db_service.get_products_by_warehouse(warehouse.id)
-            else:
-                # Get all products if no warehouse
-                from app.models import Product
-                products = Product.query.all()
+            # Fallback: list products from the catalog, reading only the columns shown (capped)
+            products = db.session.query(
+                Product.id, Product.product_name, Product.price
+            ).order_by(Product.product_name).limit(PRODUCT_FALLBACK_LIMIT).all()
         
         if not products:
             response = "No products are currently available in your area."
@@ -2299,29 +2605,9 @@ def handle_product_info_or_query(user_message, user, context_data):
             response += f"**Total Products:** {len(products)}\n\n"
             response += "Would you like to place an order for any of these products?"
             
-            # Build product list for table display
-            product_list = []
-            for product in products:
-                # Handle both dictionary (from dealer stock) and Product objects
-                if isinstance(product, dict):
-                    # Dictionary from dealer stock
-                    price = product.get('sales_price', product.get('price', 0))
-                    available = product.get('available_quantity', 0)
-                    product_name = product.get('product_name', '')
-                    product_code = product.get('product_code', '')
-                else:
-                    # Product object
-                    price = product.sales_price if hasattr(product, 'sales_price') and product.sales_price else product.price
-                    available = 0  # Will be in dealer stock
-                    product_name = product.product_name
-                    product_code = str(product.id)
-                
-                product_list.append({
-                    'product_name': product_name,
-                    'product_code': product_code,
-                    'sales_price': float(price) if price else 0.0,
-                    'available_for_sale': int(available) if available else 0
-                })
+            # Build product list for table display; rows are all dicts (dealer stock) or all Product rows
+            build_row = _product_row_from_dict if isinstance(products[0], dict) else _product_row_from_orm
+            product_list = [build_row(product) for product in products]
             
             save_conversation(user.id, user_message, response)
             return jsonify({
@@ -2349,14 +2635,24 @@ def handle_distributor_analytics(user_message, user, db_service, llm_service):
         
         # Get relevant data for analytics - filter orders by user's area
         # Explicitly specify join condition to avoid ambiguous foreign key error
-        warehouse_orders = Order.query.join(User, Order.mr_id == User.id).filter(User.area == area).all()
+        # Only aggregates are needed, so let the database compute them instead of loading every order
+        area_orders_query = db.session.query(Order).join(User, Order.mr_id == User.id).filter(User.area == area)
+        # Status histogram from GROUP BY, largest first so the per-status report reads in order
+        status_counts = dict(
+            area_orders_query.with_entities(Order.status, func.count(Order.id))
+            .group_by(Order.status)
+            .order_by(func.count(Order.id).desc())
+            .all()
+        )
+        total_orders = sum(status_counts.values())
+        recent_statuses = {status for (status,) in area_orders_query.with_entities(Order.status).order_by(Order.created_at.desc()).limit(10).all() if status}
         
         # Create context for LLM
         analytics_context = f"""
 Area: {area}
-Total Orders: {len(warehouse_orders)}
-Recent Orders: {min(10, len(warehouse_orders))} orders
-Order Statuses: {', '.join(set(o.status for o in warehouse_orders[:10]))}
+Total Orders: {total_orders}
+Recent Orders: {min(10, total_orders)} orders
+Order Statuses: {', '.join(recent_statuses)}
 
 Available Tables and Data:
 - orders: Order information (order_id, status, total_amount, order_date, user_email, user_id)
@@ -2389,32 +2685,41 @@ User Query: "{user_message}"
 
 Provide a direct answer:"""
         
-        response_obj = llm_service.client.chat.completions.create(
-            model='llama-3.3-70b-versatile',
-            messages=[{"role": "user", "content": llm_prompt}],
-            temperature=0.2,
-            max_tokens=500
-        )
-        
-        response_text = response_obj.choices[0].message.content.strip()
-        
         # Try to enhance with actual data
+        actual_data = ''
         if 'how many orders' in user_message.lower() or 'count of orders' in user_message.lower():
-            response_text += f"\n\n**Actual Data:**\n"
-            response_text += f"• Total orders in warehouse: {len(warehouse_orders)}\n"
+            actual_data = f"\n\n**Actual Data:**\n"
+            actual_data += f"• Total orders in warehouse: {total_orders}\n"
             
             # Count by status
-            from collections import Counter
-            status_counts = Counter(o.status for o in warehouse_orders)
             for status, count in status_counts.items():
-                response_text += f"• {status}: {count}\n"
+                actual_data += f"• {status}: {count}\n"
+        
+        action_buttons = [
+            {'text': 'View Orders', 'action': 'track_order'}
+        ]
+        
+        if _wants_event_stream():
+            chunks = _stream_completion(
+                llm_service.client, 'llama-3.3-70b-versatile', llm_prompt,
+                temperature=0.2, max_tokens=500
+            )
+            return _sse_reply(
+                user, user_message,
+                chain(chunks, [actual_data]) if actual_data else chunks,
+                action_buttons,
+                fallback='Sorry, I encountered an error processing your analytics request. Please try again.'
+            )
+        
+        response_text = _cached_completion(
+            llm_service.client, 'llama-3.3-70b-versatile', llm_prompt,
+            temperature=0.2, max_tokens=500
+        ).strip() + actual_data
         
         save_conversation(user.id, user_message, response_text)
         return jsonify({
             'response': response_text,
-            'action_buttons': [
-                {'text': 'View Orders', 'action': 'track_order'}
-            ]
+            'action_buttons': action_buttons
         }), 200
         
     except Exception as e:
@@ -2449,10 +2754,17 @@ def handle_web_search(user_message, user, context_data):
         logger.error(f"Error handling web search: {str(e)}")
         return ensure_action_buttons(jsonify({'response': 'Sorry, I encountered an error with the web search.'}), user), 500
 
+# Stock confirmation message patterns
+_RE_INVOICE = re.compile(r'invoice[_\s]*id[:\s]*([A-Za-z0-9_-]+)', re.IGNORECASE)
+_RE_DATE = re.compile(r'date[:\s]*(\d{4}-\d{2}-\d{2})', re.IGNORECASE)
+_RE_CONFIRM = re.compile(r'confirm\s+stock\s+(\d+)')
+_RE_RECEIVED = re.compile(r'received\s+(\d+)')
+_RE_REASON = re.compile(r'reason\s+(.+)', re.IGNORECASE | re.DOTALL)
+_RE_SHOW_PENDING = re.compile(r'\b(?:show|list|display|pending|view)\b')
+
 def handle_stock_confirmation(user_message, user, context_data):
     """Handle stock confirmation requests for dealers"""
     try:
-        import re
         from app.models import DealerWiseStockDetails
         
         db_service = get_db_service()
@@ -2461,16 +2773,16 @@ def handle_stock_confirmation(user_message, user, context_data):
         message_lower = user_message.lower()
         
         # Check if user wants to see pending stock
-        if any(keyword in message_lower for keyword in ['show', 'list', 'display', 'pending', 'view']):
+        if _RE_SHOW_PENDING.search(message_lower):
             # Check if user specified an invoice_id
             invoice_id = None
-            invoice_match = re.search(r'invoice[_\s]*id[:\s]*([A-Za-z0-9_-]+)', message_lower, re.IGNORECASE)
+            invoice_match = _RE_INVOICE.search(message_lower)
             if invoice_match:
                 invoice_id = invoice_match.group(1).strip()
             
             # Check if user specified a date filter
             date_filter = None
-            date_match = re.search(r'date[:\s]*(\d{4}-\d{2}-\d{2})', message_lower, re.IGNORECASE)
+            date_match = _RE_DATE.search(message_lower)
             if date_match:
                 date_filter = date_match.group(1).strip()
             
@@ -2496,16 +2808,10 @@ def handle_stock_confirmation(user_message, user, context_data):
             response = f"**You have {result['count']} pending stock arrival(s) to confirm:**\n\n"
             response += "**Use the form below to view and confirm stock:**\n"
             
-            # Remove purchase_price from stocks data before sending to frontend
-            stocks_for_display = []
-            for stock in result['stocks']:
-                stock_display = {k: v for k, v in stock.items() if k != 'purchase_price'}
-                stocks_for_display.append(stock_display)
-            
             save_conversation(user.id, user_message, response)
             return jsonify({
                 'response': response,
-                'stocks': stocks_for_display,
+                'stocks': result['stocks'],  # to_dict() has no purchase_price, so rows can be sent as-is
                 'invoice_ids': result.get('invoice_ids', []),
                 'invoice_dates': result.get('dispatch_dates', []),  # Renamed to invoice_dates
                 'dispatch_dates': result.get('dispatch_dates', []),  # Keep for backward compatibility
@@ -2518,19 +2824,18 @@ def handle_stock_confirmation(user_message, user, context_data):
         
         # Check if user wants to confirm stock
         # Pattern: "confirm stock <id>" or "confirm stock <id> received <quantity>"
-        confirm_pattern = r'confirm\s+stock\s+(\d+)'
-        match = re.search(confirm_pattern, message_lower)
+        match = _RE_CONFIRM.search(message_lower)
         
         if match:
             stock_id = int(match.group(1))
             
             # Try to extract received quantity
-            received_qty_match = re.search(r'received\s+(\d+)', message_lower)
+            received_qty_match = _RE_RECEIVED.search(message_lower)
             received_quantity = int(received_qty_match.group(1)) if received_qty_match else None
             
             # Try to extract adjustment reason - improved regex to capture everything after "reason"
             # Pattern: "reason" followed by whitespace, then capture everything until end of string
-            reason_match = re.search(r'reason\s+(.+)', message_lower, re.IGNORECASE | re.DOTALL)
+            reason_match = _RE_REASON.search(message_lower)
             adjustment_reason = reason_match.group(1).strip() if reason_match else None
             
             # Log extracted values for debugging
@@ -2558,8 +2863,10 @@ def handle_stock_confirmation(user_message, user, context_data):
                 response += f"\n**Status:** {stock_detail['status']}\n"
                 response += f"**Confirmed At:** {stock_detail.get('confirmed_at', 'N/A')}\n"
                 
-                # Check if there are more pending stocks
-                pending_result = stock_service.get_pending_stock_arrivals(user.unique_id)
+                # Check if there are more pending stocks (the confirmation changed them, so drop any memoized result)
+                g.get('pending_arrivals', {}).pop(user.unique_id, None)
+                g.get('pending_counts', {}).pop(user.unique_id, None)
+                pending_result = _cached_pending_arrivals(user)
                 
                 if pending_result['success'] and pending_result['count'] > 0:
                     response += f"\n**You have {pending_result['count']} more pending stock arrival(s) to confirm.**\n"
@@ -2619,9 +2926,7 @@ def handle_stock_confirmation(user_message, user, context_data):
         }), 200
         
     except Exception as e:
-        logger.error(f"Error handling stock confirmation: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error handling stock confirmation: {str(e)}")
         response = f"Sorry, I encountered an error processing your stock confirmation request: {str(e)}"
         save_conversation(user.id, user_message, response)
         return jsonify({
@@ -2632,38 +2937,67 @@ def handle_stock_confirmation(user_message, user, context_data):
             ]
         }), 500
 
-def handle_general_conversation(user_message, user, context_data):
-    """Handle general conversation using LLM"""
-    try:
-        llm_service = get_llm_service()
-        
-        if not llm_service.client:
-            response = "I'm here to help you with orders, tracking, and company information. How can I assist you today?"
-            save_conversation(user.id, user_message, response)
-            
-            # Build action buttons
-            action_buttons = [
-                {'text': 'Place Order', 'action': 'place_order'},
-                {'text': 'Track Order', 'action': 'track_order'},
-                {'text': 'Company Info', 'action': 'company_info'}
-            ]
-            
-            # For distributors (dealers), check for pending stocks and add button if needed
-            if user.role == 'distributor':
-                stock_service = get_stock_management_service()
-                pending_result = stock_service.get_pending_stock_arrivals(user.unique_id)
-                
-                if pending_result['success'] and pending_result['count'] > 0:
-                    # Add "Pending Stocks" button at the beginning
-                    action_buttons.insert(0, {'text': 'Pending Stocks', 'action': 'pending_stocks'})
-            
-            return jsonify({
-                'response': response,
-                'action_buttons': action_buttons
-            }), 200
-        
-        # Generate contextual response
-        context_prompt = f"""You are Quantum Blue's AI assistant for HV (Powered by Quantum Blue AI). 
+def _wants_event_stream():
+    """True when the chat client accepts server-sent events and the reply needs no translation"""
+    return 'text/event-stream' in request.headers.get('Accept', '') and _user_language() == 'en'
+
+def _sse_reply(user, user_message, chunks, action_buttons, fallback):
+    """
+    Stream reply text as server-sent events.
+    Emits {"delta": text} events while chunks are produced, then a final
+    {"done": true, "action_buttons": [...]} event; the full text is saved once the stream closes.
+    """
+    user_id = user.id
+    
+    def generate():
+        parts = []
+        try:
+            for text in chunks:
+                parts.append(text)
+                yield f"data: {json.dumps({'delta': text})}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming reply: {str(e)}")
+            if not parts:
+                parts.append(fallback)
+                yield f"data: {json.dumps({'delta': fallback})}\n\n"
+        finally:
+            save_conversation(user_id, user_message, ''.join(parts))
+        yield f"data: {json.dumps({'done': True, 'action_buttons': action_buttons})}\n\n"
+    
+    response = current_app.response_class(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _build_conversation_buttons(user, include_help=True):
+    """Action buttons for general conversation replies"""
+    action_buttons = [
+        {'text': 'Place Order', 'action': 'place_order'},
+        {'text': 'Track Order', 'action': 'track_order'},
+        {'text': 'Company Info', 'action': 'company_info'}
+    ]
+    # Distributors with stock waiting for confirmation get a "Pending Stocks" button first
+    if user.role == 'distributor' and _cached_pending_count(user) > 0:
+        action_buttons.insert(0, {'text': 'Pending Stocks', 'action': 'pending_stocks'})
+    if include_help:
+        action_buttons.append({'text': 'Get Help', 'action': 'help'})
+    return action_buttons
+
+# Canned replies for short greetings/acknowledgements (keyed by lowercased message without trailing punctuation)
+_CANNED = {
+    'hi': "Hi! I'm here to help you with orders, tracking, and company information. What would you like to do?",
+    'hello': "Hello! I'm here to help you with orders, tracking, and company information. What would you like to do?",
+    'hey': "Hey! I'm here to help you with orders, tracking, and company information. What would you like to do?",
+    'thanks': "You're welcome! Let me know if there's anything else I can help you with.",
+    'thank you': "You're welcome! Let me know if there's anything else I can help you with.",
+    'ok': "Great! Let me know if there's anything else I can help you with.",
+    'okay': "Great! Let me know if there's anything else I can help you with.",
+    'bye': "Goodbye! Feel free to come back anytime you need help with your orders.",
+}
+
+def _general_conversation_prompt(user_message, user):
+    """LLM prompt for a general conversation turn"""
+    return f"""You are Quantum Blue's AI assistant for HV (Powered by Quantum Blue AI). 
         
 User: {user_message}
 
@@ -2681,33 +3015,44 @@ Your task:
 
 Respond naturally and helpfully."""
 
-        response_obj = llm_service.client.chat.completions.create(
-            model=current_app.config.get('GROQ_MODEL', 'mixtral-8x7b-32768'),
-            messages=[{"role": "user", "content": context_prompt}],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        response = response_obj.choices[0].message.content
-        save_conversation(user.id, user_message, response)
+def handle_general_conversation(user_message, user, context_data):
+    """Handle general conversation using LLM"""
+    try:
+        # Greetings and acknowledgements get a canned reply without an LLM round trip
+        response = _CANNED.get(user_message.strip().lower().rstrip('!.?'))
+        if response is None:
+            llm_service = get_llm_service()
         
-        # Build action buttons
-        action_buttons = [
-            {'text': 'Place Order', 'action': 'place_order'},
-            {'text': 'Track Order', 'action': 'track_order'},
-            {'text': 'Company Info', 'action': 'company_info'}
-        ]
+            if not llm_service.client:
+                response = "I'm here to help you with orders, tracking, and company information. How can I assist you today?"
+                save_conversation(user.id, user_message, response)
+            
+                action_buttons = _build_conversation_buttons(user, include_help=False)
+            
+                return jsonify({
+                    'response': response,
+                    'action_buttons': action_buttons
+                }), 200
         
-        # For distributors (dealers), check for pending stocks and add button if needed
-        if user.role == 'distributor':
-            stock_service = get_stock_management_service()
-            pending_result = stock_service.get_pending_stock_arrivals(user.unique_id)
+            # Generate contextual response
+            context_prompt = _general_conversation_prompt(user_message, user)
+            model = current_app.config.get('GROQ_MODEL', 'mixtral-8x7b-32768')
             
-            if pending_result['success'] and pending_result['count'] > 0:
-                # Add "Pending Stocks" button at the beginning
-                action_buttons.insert(0, {'text': 'Pending Stocks', 'action': 'pending_stocks'})
+            if _wants_event_stream():
+                return _sse_reply(
+                    user, user_message,
+                    _stream_completion(llm_service.client, model, context_prompt, temperature=0.7, max_tokens=500),
+                    _build_conversation_buttons(user),
+                    fallback="I'm here to help you with orders, tracking, and company information. How can I assist you today?"
+                )
+
+            response = _cached_completion(
+                llm_service.client, model, context_prompt,
+                temperature=0.7, max_tokens=500
+            )
+        save_conversation(user.id, user_message, response)
         
-        action_buttons.append({'text': 'Get Help', 'action': 'help'})
+        action_buttons = _build_conversation_buttons(user)
         
         return jsonify({
             'response': response,
@@ -2719,21 +3064,7 @@ Respond naturally and helpfully."""
         response = "I'm here to help you with orders, tracking, and company information. How can I assist you today?"
         save_conversation(user.id, user_message, response)
         
-        # Build action buttons
-        action_buttons = [
-            {'text': 'Place Order', 'action': 'place_order'},
-            {'text': 'Track Order', 'action': 'track_order'},
-            {'text': 'Company Info', 'action': 'company_info'}
-        ]
-        
-        # For distributors (dealers), check for pending stocks and add button if needed
-        if user.role == 'distributor':
-            stock_service = get_stock_management_service()
-            pending_result = stock_service.get_pending_stock_arrivals(user.unique_id)
-            
-            if pending_result['success'] and pending_result['count'] > 0:
-                # Add "Pending Stocks" button at the beginning
-                action_buttons.insert(0, {'text': 'Pending Stocks', 'action': 'pending_stocks'})
+        action_buttons = _build_conversation_buttons(user, include_help=False)
         
         return jsonify({
             'response': response,
@@ -2765,13 +3096,12 @@ Type **"generate report"** to get started or **"help"** for more information."""
         return f"Hello {user.name}! As a Medical Representative, you can place orders for your clients and track deliveries. How can I assist you today?"
     elif user.role == 'distributor':
         # Check for pending stocks to confirm
-        stock_service = get_stock_management_service()
-        pending_result = stock_service.get_pending_stock_arrivals(user.unique_id)
+        pending_count = _cached_pending_count(user)
         
         welcome_msg = f"Welcome {user.name}! As a Distributor, you can manage orders, confirm deliveries, and track inventory."
         
-        if pending_result['success'] and pending_result['count'] > 0:
-            welcome_msg += f"\n\n📦 **Important:** You have {pending_result['count']} pending stock arrival(s) to confirm. Type 'show pending stock' or 'show pending orders' to view and confirm them."
+        if pending_count > 0:
+            welcome_msg += f"\n\n📦 **Important:** You have {pending_count} pending stock arrival(s) to confirm. Type 'show pending stock' or 'show pending orders' to view and confirm them."
         
         welcome_msg += "\n\nWhat would you like to do?"
         return welcome_msg
@@ -2785,20 +3115,42 @@ def save_conversation(user_id, user_message, bot_response):
     Save conversation to database.
     IMPORTANT: Always saves in English (original language).
     Translation happens only when sending to user, not when saving to database.
+    Rows are buffered on g and written together when the request ends (see flush_conversations).
     """
     try:
-        db_service = get_db_service()
         session_id = session.get('session_id')
         
         if session_id:
             # Always save original English text to database
             # Translation is only for display to user, not for storage
-            db_service.save_conversation(
-                user_id=user_id,
-                session_id=session_id,
-                user_message=user_message,
-                bot_response=bot_response  # This should be the original English response
-            )
+            if 'conv_buffer' not in g:
+                g.conv_buffer = []
+            g.conv_buffer.append({
+                'user_id': user_id,
+                'session_id': session_id,
+                'user_message': user_message,
+                'bot_response': bot_response  # This should be the original English response
+            })
+    except Exception as e:
+        logger.error(f"Error saving conversation: {str(e)}")
+
+@chatbot_bp.teardown_request
+def flush_conversations(exc):
+    """Write the conversations buffered during this request in one background insert"""
+    rows = g.pop('conv_buffer', None)
+    if not rows:
+        return
+    try:
+        app = current_app._get_current_object()
+        _background_executor.submit(_save_conversations_worker, app, rows)
+    except Exception as e:
+        logger.error(f"Error saving conversation: {str(e)}")
+
+def _save_conversations_worker(app, rows):
+    """Persist buffered conversation rows outside the request thread"""
+    try:
+        with app.app_context():
+            get_db_service().save_conversations(rows)
     except Exception as e:
         logger.error(f"Error saving conversation: {str(e)}")
 
@@ -2899,7 +3251,7 @@ def select_customer():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role not in ['mr', 'distributor']:
             return jsonify({'error': 'Only MRs and Dealers can select customers'}), 403
         
@@ -2931,6 +3283,7 @@ def select_customer():
         # Store selected customer in session
         session['selected_customer_id'] = customer.id
         session['selected_customer_unique_id'] = customer.unique_id
+        session['selected_customer_name'] = customer.name
         
         # Get available products for the MR or Dealer
         db_service = get_db_service()
@@ -2940,9 +3293,9 @@ def select_customer():
             from app.models import Product
             products = Product.query.all()
         
-        # Build product list for interactive UI with FOC information using helper
+        # Build product list for interactive UI with FOC information using helper (cached across customer selections)
         pricing_service = get_pricing_service()
-        product_list = build_product_list_with_foc(products, pricing_service)
+        product_list = cached_product_list_with_foc(products, pricing_service)
         
         # Create response message with customer info
         role_display = "Dealer" if user.role == 'distributor' else "MR"
@@ -2979,17 +3332,70 @@ def select_customer():
         logger.error(f"Error selecting customer: {str(e)}")
         return jsonify({'error': 'Error selecting customer'}), 500
 
+def _resolve_order_entities(orders):
+    """
+    Delivery partner and customer for each order, as {order.id: (delivery_partner, customer)}.
+    Relationships already loaded on an order are used as-is; everything else is fetched with
+    at most one User query and one Customer query for the whole batch.
+    """
+    partner_ids, partner_unique_ids = set(), set()
+    customer_ids, customer_unique_ids = set(), set()
+    for order in orders:
+        unloaded = sa_inspect(order).unloaded
+        if order.delivery_partner_id:
+            if 'delivery_partner' in unloaded:
+                partner_ids.add(order.delivery_partner_id)
+        elif order.delivery_partner_unique_id:
+            partner_unique_ids.add(order.delivery_partner_unique_id)
+        if order.customer_id:
+            if 'customer' in unloaded:
+                customer_ids.add(order.customer_id)
+        elif order.customer_unique_id:
+            customer_unique_ids.add(order.customer_unique_id)
+    
+    users_by_id, users_by_unique_id = {}, {}
+    if partner_ids or partner_unique_ids:
+        for partner in User.query.filter(or_(User.id.in_(partner_ids), User.unique_id.in_(partner_unique_ids))).all():
+            users_by_id[partner.id] = partner
+            users_by_unique_id[partner.unique_id] = partner
+    customers_by_id, customers_by_unique_id = {}, {}
+    if customer_ids or customer_unique_ids:
+        for customer in Customer.query.filter(or_(Customer.id.in_(customer_ids), Customer.unique_id.in_(customer_unique_ids))).all():
+            customers_by_id[customer.id] = customer
+            customers_by_unique_id[customer.unique_id] = customer
+    
+    resolved = {}
+    for order in orders:
+        unloaded = sa_inspect(order).unloaded
+        if order.delivery_partner_id:
+            partner = users_by_id.get(order.delivery_partner_id) if 'delivery_partner' in unloaded else order.delivery_partner
+        else:
+            partner = users_by_unique_id.get(order.delivery_partner_unique_id)
+        if order.customer_id:
+            customer = customers_by_id.get(order.customer_id) if 'customer' in unloaded else order.customer
+        else:
+            customer = customers_by_unique_id.get(order.customer_unique_id)
+        resolved[order.id] = (partner, customer)
+    return resolved
+
+def _fefo_order_by():
+    """ORDER BY for FEFO (First Expiry First Out): earliest expiry first, stock without an expiry date last"""
+    expiry_date = DealerWiseStockDetails.expiry_date
+    if db.engine.dialect.name in ('postgresql', 'sqlite'):
+        return (expiry_date.asc().nulls_last(),)
+    # SQL Server has no NULLS LAST and sorts NULLs first, so push them down with a CASE
+    return (case((expiry_date.is_(None), 1), else_=0), expiry_date.asc())
+
 @chatbot_bp.route('/select_order', methods=['POST'])
 def select_order():
     """Select order for distributor or MR to view details"""
-    from app.input_validation import validate_and_sanitize_order_id
     try:
         user_id = session.get('user_id')
         if not user_id:
             logger.warning("select_order: User not logged in")
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user:
             logger.warning(f"select_order: User {user_id} not found")
             return jsonify({'error': 'User not found'}), 404
@@ -3016,7 +3422,12 @@ def select_order():
         
         # Get order details
         enhanced_order_service = get_enhanced_order_service()
-        order = Order.query.filter_by(order_id=order_id).first()
+        # MR, customer and delivery partner are read throughout the response; load them in the same SELECT
+        order = Order.query.options(
+            joinedload(Order.mr),
+            joinedload(Order.customer),
+            joinedload(Order.delivery_partner)
+        ).filter_by(order_id=order_id).first()
         
         if not order:
             logger.warning(f"select_order: Order {order_id} not found")
@@ -3039,20 +3450,44 @@ def select_order():
         # Get order items with FOC and lot numbers
         items_list = []
         total_items = 0
+        # Running subtotal of item totals and whether any quantity was adjusted, accumulated while building items_list
+        recalculated_subtotal = 0.0
+        has_adjustments = False
         
-        # Get dealers in MR's area for lot number lookup
-        dealers_in_area = []
-        if order.mr and order.mr.area:
-            dealers_in_area = User.query.filter_by(
-                role='distributor',
-                area=order.mr.area
-            ).all()
-        dealer_unique_ids = [d.unique_id for d in dealers_in_area] if dealers_in_area else []
+        # order_items is a dynamic relationship, so eager loading goes on its query; only the product name is shown
+        order_items = order.order_items.options(
+            joinedload(OrderItem.product).load_only(Product.product_name)
+        ).all()
         
-        for item in order.order_items:
+        # Lot numbers for items without an adjusted lot: one FEFO (First Expiry First Out) query for all
+        # their products; rows come back earliest expiry first, so the first row per product wins
+        stock_by_product = {}
+        lookup_codes = {item.product_code for item in order_items if not item.adjusted_lot_number}
+        
+        # Get dealers in MR's area for lot number lookup (not needed when every item has an adjusted lot)
+        dealer_unique_ids = []
+        if lookup_codes and order.mr and order.mr.area:
+            dealer_unique_ids = get_db_service().get_dealer_unique_ids_by_area(order.mr.area)
+        
+        if lookup_codes and dealer_unique_ids:
+            stock_details = DealerWiseStockDetails.query.filter(
+                DealerWiseStockDetails.product_code.in_(lookup_codes),
+                DealerWiseStockDetails.status == 'confirmed',
+                DealerWiseStockDetails.dealer_unique_id.in_(dealer_unique_ids),
+                DealerWiseStockDetails.blocked_quantity > 0
+            ).order_by(*_fefo_order_by()).all()
+            for stock_detail in stock_details:
+                stock_by_product.setdefault(stock_detail.product_code, stock_detail)
+        
+        for item in order_items:
+            # Read the item fields used several times below once
+            adjusted_quantity = item.adjusted_quantity
+            ordered_quantity = item.quantity
+            product_code = item.product_code
+            
             # Use adjusted_quantity if available (after dealer confirmation), otherwise use original quantity
             # This ensures we display the actual dispatched quantity, not the original ordered quantity
-            actual_quantity = item.adjusted_quantity if item.adjusted_quantity is not None else item.quantity
+            actual_quantity = adjusted_quantity if adjusted_quantity is not None else ordered_quantity
             free_qty = item.free_quantity or 0
             # When quantity is adjusted, FOC may have been moved to pending, so use current free_quantity
             total_qty = actual_quantity + free_qty
@@ -3066,88 +3501,79 @@ def select_order():
             if item.adjusted_lot_number:
                 lot_number = item.adjusted_lot_number
             
-            # If no adjusted lot number, try to get from DealerWiseStockDetails
-            if not lot_number and dealer_unique_ids:
-                # Get the first available stock detail with lot number for this product
-                # Use FEFO (First Expiry First Out) - earliest expiry first
-                from sqlalchemy import case
-                stock_detail = DealerWiseStockDetails.query.filter(
-                    DealerWiseStockDetails.product_code == item.product_code,
-                    DealerWiseStockDetails.status == 'confirmed',
-                    DealerWiseStockDetails.dealer_unique_id.in_(dealer_unique_ids),
-                    DealerWiseStockDetails.blocked_quantity > 0
-                ).order_by(
-                    case(
-                        (DealerWiseStockDetails.expiry_date.is_(None), 1),
-                        else_=0
-                    ),
-                    DealerWiseStockDetails.expiry_date.asc()
-                ).first()
-                
+            # If no adjusted lot number, use the FEFO stock detail fetched above
+            if not lot_number:
+                stock_detail = stock_by_product.get(product_code)
                 if stock_detail:
                     lot_number = stock_detail.lot_number
-                    expiry_date = stock_detail.expiry_date.strftime('%Y-%m-%d') if stock_detail.expiry_date else None
+                    expiry_date = stock_detail.expiry_date.isoformat() if stock_detail.expiry_date else None
             
             # Prefer adjusted_expiry_date if available
             if item.adjusted_expiry_date:
-                expiry_date = item.adjusted_expiry_date.strftime('%Y-%m-%d')
+                expiry_date = item.adjusted_expiry_date.isoformat()
             
             # Recalculate total_price based on adjusted quantity if quantity was adjusted
             unit_price = float(item.unit_price) if item.unit_price else 0.0
-            if item.adjusted_quantity is not None and item.adjusted_quantity != item.quantity:
+            if adjusted_quantity is not None and adjusted_quantity != ordered_quantity:
                 # Quantity was adjusted, recalculate total_price based on adjusted quantity
                 total_price = float(actual_quantity * unit_price)
+                has_adjustments = True
             else:
                 # Use original total_price if quantity wasn't adjusted
                 total_price = float(item.total_price) if item.total_price else 0.0
+            recalculated_subtotal += total_price
             
             items_list.append({
                 'id': item.id,  # Include item ID for editing
                 'product_name': item.product.product_name,
-                'product_code': item.product_code,
+                'product_code': product_code,
                 'quantity': actual_quantity,  # Use adjusted quantity if available
-                'original_quantity': item.quantity,  # Store original quantity for comparison
+                'original_quantity': ordered_quantity,  # Store original quantity for comparison
                 'free_quantity': free_qty,
                 'total_quantity': total_qty,
                 'unit_price': unit_price,
                 'total_price': total_price,  # Recalculated if quantity was adjusted
                 'lot_number': lot_number,  # Prefer adjusted_lot_number, fallback to stock details
                 'expiry_date': expiry_date,  # Prefer adjusted_expiry_date, fallback to stock details
-                'adjusted_quantity': item.adjusted_quantity,  # Include for reference
+                'adjusted_quantity': adjusted_quantity,  # Include for reference
                 'adjustment_reason': item.adjustment_reason  # Include adjustment reason if available
             })
         
+        # Delivery partner and customer (from the eager-loaded relationships, or by unique_id for older orders)
+        delivery_partner, customer = _resolve_order_entities([order])[order.id]
+        
         # Get customer info if available
         customer_name = None
         customer_id = None
-        if order.customer_id:
-            # Try to get customer from relationship first
-            if order.customer:
-                customer_name = f"{order.customer.name} ({order.customer.unique_id})"
-                customer_id = order.customer.unique_id
-            else:
-                # If relationship not loaded, query directly
-                from app.models import Customer
-                customer = Customer.query.get(order.customer_id)
-                if customer:
-                    customer_name = f"{customer.name} ({customer.unique_id})"
-                    customer_id = customer.unique_id
-        elif order.customer_unique_id:
-            # Fallback: try to get customer by unique_id
-            from app.models import Customer
-            customer = Customer.query.filter_by(unique_id=order.customer_unique_id).first()
-            if customer:
-                customer_name = f"{customer.name} ({customer.unique_id})"
-                customer_id = customer.unique_id
+        if customer:
+            customer_name = f"{customer.name} ({customer.unique_id})"
+            customer_id = customer.unique_id
+        
+        # Pending rows linked to this order, fetched together and split by direction
+        linked_pending = PendingOrderProducts.query.filter(or_(
+            PendingOrderProducts.fulfilled_order_id == order.order_id,
+            PendingOrderProducts.original_order_id == order.order_id
+        )).all()
+        # Pending orders that were fulfilled by this order
+        pending_sources = [p for p in linked_pending if p.fulfilled_order_id == order.order_id]
+        # Pending orders that were created FROM this order (when order was partially dispatched)
+        pending_orders_from_this = [p for p in linked_pending if p.original_order_id == order.order_id]
+        
+        # Creation dates of the linked orders on both sides, fetched in one IN query
+        linked_order_ids = {p.original_order_id for p in pending_sources if p.original_order_id}
+        linked_order_ids.update(p.fulfilled_order_id for p in pending_orders_from_this if p.fulfilled_order_id)
+        linked_order_dates = {}
+        if linked_order_ids:
+            linked_order_dates = dict(
+                db.session.query(Order.order_id, Order.created_at)
+                .filter(Order.order_id.in_(linked_order_ids))
+                .all()
+            )
         
-        # Find any pending orders that were fulfilled by this order
-        pending_sources = PendingOrderProducts.query.filter_by(fulfilled_order_id=order.order_id).all()
         pending_source_orders = []
         for p in pending_sources:
-            original_order = None
-            if p.original_order_id:
-                original_order = Order.query.filter_by(order_id=p.original_order_id).first()
-            original_date = original_order.created_at.strftime('%Y-%m-%d %H:%M:%S') if (original_order and original_order.created_at) else None
+            original_created_at = linked_order_dates.get(p.original_order_id) if p.original_order_id else None
+            original_date = original_created_at.isoformat(' ', 'seconds') if original_created_at else None
             pending_source_orders.append({
                 'pending_id': p.id,
                 'original_order_id': p.original_order_id,
@@ -3157,15 +3583,12 @@ def select_order():
                 'original_order_date': original_date
             })
         
-        # Find any pending orders that were created FROM this order (when order was partially dispatched)
-        pending_orders_from_this = PendingOrderProducts.query.filter_by(original_order_id=order.order_id).all()
         pending_orders_created = []
         for p in pending_orders_from_this:
-            fulfilled_order = None
             fulfilled_order_date = None
             if p.fulfilled_order_id:
-                fulfilled_order = Order.query.filter_by(order_id=p.fulfilled_order_id).first()
-                fulfilled_order_date = fulfilled_order.created_at.strftime('%Y-%m-%d %H:%M:%S') if (fulfilled_order and fulfilled_order.created_at) else None
+                fulfilled_created_at = linked_order_dates.get(p.fulfilled_order_id)
+                fulfilled_order_date = fulfilled_created_at.isoformat(' ', 'seconds') if fulfilled_created_at else None
             pending_orders_created.append({
                 'pending_id': p.id,
                 'product_code': p.product_code,
@@ -3176,7 +3599,7 @@ def select_order():
                 'status': p.status,
                 'fulfilled_order_id': p.fulfilled_order_id,
                 'fulfilled_order_date': fulfilled_order_date,
-                'created_at': p.created_at.strftime('%Y-%m-%d %H:%M:%S') if p.created_at else None
+                'created_at': p.created_at.isoformat(' ', 'seconds') if p.created_at else None
             })
         
         # Get delivery partner info if available
@@ -3184,20 +3607,11 @@ def select_order():
         delivery_partner_email = None
         delivery_partner_phone = None
         delivery_partner_unique_id = None
-        if order.delivery_partner_id:
-            delivery_partner = User.query.get(order.delivery_partner_id)
-            if delivery_partner:
-                delivery_partner_name = delivery_partner.name
-                delivery_partner_email = delivery_partner.email
-                delivery_partner_phone = delivery_partner.phone
-                delivery_partner_unique_id = delivery_partner.unique_id
-        elif order.delivery_partner_unique_id:
-            delivery_partner = User.query.filter_by(unique_id=order.delivery_partner_unique_id).first()
-            if delivery_partner:
-                delivery_partner_name = delivery_partner.name
-                delivery_partner_email = delivery_partner.email
-                delivery_partner_phone = delivery_partner.phone
-                delivery_partner_unique_id = delivery_partner.unique_id
+        if delivery_partner:
+            delivery_partner_name = delivery_partner.name
+            delivery_partner_email = delivery_partner.email
+            delivery_partner_phone = delivery_partner.phone
+            delivery_partner_unique_id = delivery_partner.unique_id
         
         # Get "placed_by" information
         placed_by_role = order.created_by_role
@@ -3221,28 +3635,23 @@ def select_order():
                 placed_by_display = f"MR: {placed_by_name}"
         
         # Recalculate order totals based on adjusted quantities if any items were adjusted
-        # Sum up all item total prices (which are already recalculated based on adjusted quantities)
-        recalculated_subtotal = sum(item.get('total_price', 0) for item in items_list)
-        # Check if any item has adjusted_quantity that differs from original_quantity
-        has_adjustments = any(item.get('adjusted_quantity') is not None and 
-                             item.get('adjusted_quantity') != item.get('original_quantity', 0) 
-                             for item in items_list)
-        
+        # (recalculated_subtotal and has_adjustments were accumulated in the item loop)
         # Use recalculated values if quantities were adjusted, otherwise use original order values
+        tax_rate = float(order.tax_rate or 0.05)
         if has_adjustments:
-            tax_rate = float(order.tax_rate) if hasattr(order, 'tax_rate') and order.tax_rate else 0.05
             recalculated_tax = recalculated_subtotal * tax_rate
             recalculated_total = recalculated_subtotal + recalculated_tax
             subtotal = recalculated_subtotal
             tax_amount = recalculated_tax
             total_amount = recalculated_total
         else:
-            subtotal = float(order.subtotal) if hasattr(order, 'subtotal') and order.subtotal else 0.0
-            tax_rate = float(order.tax_rate) if hasattr(order, 'tax_rate') and order.tax_rate else 0.05
-            tax_amount = float(order.tax_amount) if hasattr(order, 'tax_amount') and order.tax_amount else 0.0
-            total_amount = float(order.total_amount) if order.total_amount else 0.0
+            subtotal = float(order.subtotal or 0.0)
+            tax_amount = float(order.tax_amount or 0.0)
+            total_amount = float(order.total_amount or 0.0)
         
         # Build detailed response including a timeline-friendly set of timestamps
+        # (display strings are slices of one 'YYYY-MM-DD HH:MM:SS' rendering of created_at)
+        created_at_text = order.created_at.isoformat(' ', 'seconds') if order.created_at else None
         order_details = {
             'order_id': order.order_id,
             'mr_name': order.mr.name if order.mr else 'N/A',
@@ -3250,16 +3659,16 @@ def select_order():
             'mr_phone': order.mr.phone if order.mr else 'N/A',
             'status': order.status,
             'status_display': (order.status or 'Unknown').replace('_', ' ').title(),
-            'order_stage': getattr(order, 'order_stage', None),
+            'order_stage': order.order_stage,
             'subtotal': subtotal,
             'tax_rate': tax_rate,
             'tax_amount': tax_amount,
             'total_amount': total_amount,
             'total_items': total_items,
             # Base timestamps
-            'order_date': order.created_at.strftime('%Y-%m-%d') if order.created_at else 'N/A',
-            'order_time': order.created_at.strftime('%H:%M') if order.created_at else 'N/A',
-            'order_datetime': order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else 'N/A',
+            'order_date': created_at_text[:10] if created_at_text else 'N/A',
+            'order_time': created_at_text[11:16] if created_at_text else 'N/A',
+            'order_datetime': created_at_text or 'N/A',
             # Timeline specific fields (ISO strings so frontend can render nicely)
             'placed_at': order.created_at.isoformat() if order.created_at else None,
             'distributor_confirmed_at': order.distributor_confirmed_at.isoformat() if order.distributor_confirmed_at else None,
@@ -3290,7 +3699,8 @@ def select_order():
             'can_cancel': order.status in ['pending', 'draft'] and user.role == 'mr'
         }
         
-        return jsonify({
+        # Large orders carry many item/pending rows; serialize with orjson when available
+        return fast_jsonify({
             'success': True,
             'order': order_details
         }), 200
@@ -3299,20 +3709,18 @@ def select_order():
         logger.error(f"Error selecting order: {str(e)}")
         return jsonify({'error': 'Error selecting order'}), 500
 
+# Expiry dates in item edits must be YYYY-MM-DD
+_EXPIRY_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
 @chatbot_bp.route('/confirm_order_action', methods=['POST'])
 def confirm_order_action():
     """Confirm order by distributor"""
     try:
-        from app.input_validation import (
-            validate_and_sanitize_order_id, validate_quantity, 
-            sanitize_string, MAX_LENGTHS, sanitize_dict
-        )
-        
         user_id = session.get('user_id')
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Only distributors can confirm orders'}), 403
         
@@ -3379,11 +3787,14 @@ def confirm_order_action():
                         if lot:
                             sanitized_edit['lot_number'] = lot
                     
-                    # Validate expiry_date (format: YYYY-MM-DD)
+                    # Validate expiry_date (format: YYYY-MM-DD) and convert it to a date object
                     if 'expiry_date' in edits and edits['expiry_date']:
                         expiry = sanitize_string(str(edits['expiry_date']), max_length=10)
-                        if expiry and re.match(r'^\d{4}-\d{2}-\d{2}$', expiry):
-                            sanitized_edit['expiry_date'] = expiry
+                        if expiry and _EXPIRY_RE.match(expiry):
+                            try:
+                                sanitized_edit['expiry_date'] = datetime.strptime(expiry, '%Y-%m-%d').date()
+                            except ValueError:
+                                sanitized_edit['expiry_date'] = expiry
                     
                     # Sanitize reason
                     if 'reason' in edits and edits['reason']:
@@ -3397,24 +3808,6 @@ def confirm_order_action():
                 except (ValueError, TypeError):
                     continue
         
-        # Convert expiry_date strings to date objects and item_id to int if provided
-        if item_edits:
-            from datetime import datetime
-            converted_edits = {}
-            for item_id_str, edits in item_edits.items():
-                try:
-                    item_id = int(item_id_str)
-                    converted_edit = edits.copy()
-                    if 'expiry_date' in converted_edit and converted_edit['expiry_date']:
-                        try:
-                            converted_edit['expiry_date'] = datetime.strptime(converted_edit['expiry_date'], '%Y-%m-%d').date()
-                        except:
-                            pass
-                    converted_edits[item_id] = converted_edit
-                except (ValueError, TypeError):
-                    pass
-            item_edits = converted_edits
-        
         # Confirm order with edits and delivery partner
         enhanced_order_service = get_enhanced_order_service()
         result = enhanced_order_service.confirm_order_by_distributor(order_id, user.id, item_edits, delivery_partner_id)
@@ -3429,8 +3822,6 @@ def confirm_order_action():
 def search_products():
     """Search for products in Azure AI Search"""
     try:
-        from app.input_validation import sanitize_string, MAX_LENGTHS
-        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'Invalid JSON or missing Content-Type header'}), 400
@@ -3448,7 +3839,7 @@ def search_products():
             return jsonify({'error': 'Azure AI Search is not configured'}), 503
         
         # Search for products
-        results = search_service.search_products(search_query, top=20)
+        results = _cached_search(('search', search_query, 20), lambda: search_service.search_products(search_query, top=20))
         
         product_list = []
         for product in results:
@@ -3473,8 +3864,6 @@ def search_products():
 def get_product_details():
     """Get detailed information about a specific product"""
     try:
-        from app.input_validation import sanitize_string, MAX_LENGTHS
-        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'Invalid JSON or missing Content-Type header'}), 400
@@ -3518,11 +3907,18 @@ def get_product_details():
         # Try to get product by name first, then by ID/string
         product = None
         if product_name:
-            product = search_service.get_product_by_name(product_name)
+            product = _cached_search(('detail', product_name), lambda: search_service.get_product_by_name(product_name))
+        
+        if not product and product_id:
+            # Numeric IDs are local product IDs: resolve the name by primary key and do an exact (cached)
+            # name lookup instead of a fuzzy search filtered by ID
+            local_product_name = db.session.query(Product.product_name).filter(Product.id == product_id).scalar()
+            if local_product_name:
+                product = _cached_search(('detail', local_product_name), lambda: search_service.get_product_by_name(local_product_name))
         
         if not product and product_id_str:
             # Search by ID string (could be integer ID or product name)
-            results = search_service.search_products(product_id_str, top=10)
+            results = _cached_search(('search', product_id_str, 10), lambda: search_service.search_products(product_id_str, top=10))
             if results:
                 # If we have a numeric ID, try to find exact match first
                 if product_id:
@@ -3565,13 +3961,11 @@ def get_product_details():
 def cancel_order_action():
     """Cancel order by MR"""
     try:
-        from app.input_validation import validate_and_sanitize_order_id
-        
         user_id = session.get('user_id')
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'mr':
             return jsonify({'error': 'Only MRs can cancel their orders'}), 403
         
@@ -3608,7 +4002,7 @@ def export_orders_excel_removed():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -3616,85 +4010,102 @@ def export_orders_excel_removed():
         order_ids = data.get('order_ids')  # None = all orders
         
         from app.models import Order, OrderItem
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from io import BytesIO
+        from tempfile import SpooledTemporaryFile
         
-        # Query orders
+        # Query orders; MR and customer names are read for every row, so load them in the same query
+        orders_query = Order.query.options(joinedload(Order.mr), joinedload(Order.customer))
         if user.role == 'distributor':
             # Get MRs in distributor's area
-            mr_ids = [u.id for u in User.query.filter_by(role='mr', area=user.area).all()]
+            mr_ids = _mr_ids_subquery(user.area)
             if order_ids:
-                orders = Order.query.filter(Order.order_id.in_(order_ids), Order.mr_id.in_(mr_ids)).all()
+                orders = orders_query.filter(Order.order_id.in_(order_ids), Order.mr_id.in_(mr_ids)).all()
             else:
-                orders = Order.query.filter(Order.mr_id.in_(mr_ids)).all()
+                orders = orders_query.filter(Order.mr_id.in_(mr_ids)).all()
         elif user.role == 'mr':
             if order_ids:
-                orders = Order.query.filter(Order.order_id.in_(order_ids), Order.mr_id == user_id).all()
+                orders = orders_query.filter(Order.order_id.in_(order_ids), Order.mr_id == user_id).all()
             else:
-                orders = Order.query.filter_by(mr_id=user_id).all()
+                orders = orders_query.filter_by(mr_id=user_id).all()
         else:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Orders Export"
+        # Only the per-order item count is exported, so sum it in SQL
+        total_items_by_order = {}
+        if orders:
+            total_items_by_order = dict(db.session.query(
+                OrderItem.order_id,
+                func.sum(OrderItem.quantity + func.coalesce(OrderItem.free_quantity, 0))
+            ).filter(
+                OrderItem.order_id.in_([o.id for o in orders])
+            ).group_by(OrderItem.order_id).all())
         
-        # Header row
         headers = ['Order ID', 'Date', 'Status', 'MR Name', 'Customer', 'Total Items', 'Subtotal', 'Tax', 'Grand Total (MMK)']
-        header_fill = PatternFill(start_color="2563eb", end_color="2563eb", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Data rows
-        for row_num, order in enumerate(orders, 2):
-            ws.cell(row=row_num, column=1, value=order.order_id)
-            ws.cell(row=row_num, column=2, value=order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else 'N/A')
-            ws.cell(row=row_num, column=3, value=(order.status or 'N/A').replace('_', ' ').title())
-            ws.cell(row=row_num, column=4, value=order.mr.name if order.mr else 'N/A')
-            ws.cell(row=row_num, column=5, value=order.customer.name if order.customer else 'N/A')
+        # Widths are preset from the header (with room for dates and names); auto-fit would need every row in memory
+        column_widths = [min(max(len(header), 18) + 2, 50) for header in headers]
+        
+        def export_rows():
+            for order in orders:
+                yield [
+                    order.order_id,
+                    order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else 'N/A',
+                    (order.status or 'N/A').replace('_', ' ').title(),
+                    order.mr.name if order.mr else 'N/A',
+                    order.customer.name if order.customer else 'N/A',
+                    int(total_items_by_order.get(order.id) or 0),
+                    float(order.subtotal) if order.subtotal else 0.0,
+                    float(order.tax_amount) if order.tax_amount else 0.0,
+                    float(order.total_amount) if order.total_amount else 0.0
+                ]
+        
+        # Spooled temp file: memory up to 16MB, disk beyond; send_file streams it back
+        output = SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+        
+        if XLSXWRITER_AVAILABLE:
+            # constant_memory flushes each row to disk as soon as the next one starts
+            wb = xlsxwriter.Workbook(output, {'constant_memory': True})
+            ws = wb.add_worksheet('Orders Export')
+            header_format = wb.add_format({
+                'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#2563EB',
+                'align': 'center', 'valign': 'vcenter'
+            })
+            for col_num, width in enumerate(column_widths):
+                ws.set_column(col_num, col_num, width)
+            ws.write_row(0, 0, headers, header_format)
+            for row_num, row in enumerate(export_rows(), 1):
+                ws.write_row(row_num, 0, row)
+            wb.close()
+        else:
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font, PatternFill, Alignment
+            from openpyxl.utils import get_column_letter
             
-            # Calculate totals
-            total_items = sum(item.quantity + (item.free_quantity or 0) for item in order.order_items)
-            subtotal = float(order.subtotal) if order.subtotal else 0.0
-            tax = float(order.tax_amount) if order.tax_amount else 0.0
-            grand_total = float(order.total_amount) if order.total_amount else 0.0
+            # Write-only workbook streams rows out instead of keeping every cell in memory
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Orders Export")
+            for col_num, width in enumerate(column_widths, 1):
+                ws.column_dimensions[get_column_letter(col_num)].width = width
             
-            ws.cell(row=row_num, column=6, value=total_items)
-            ws.cell(row=row_num, column=7, value=subtotal)
-            ws.cell(row=row_num, column=8, value=tax)
-            ws.cell(row=row_num, column=9, value=grand_total)
-        
-        # Auto-adjust column widths
-        for col in ws.columns:
-            max_length = 0
-            col_letter = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[col_letter].width = adjusted_width
-        
-        # Save to BytesIO
-        output = BytesIO()
-        wb.save(output)
+            header_fill = PatternFill(start_color="2563eb", end_color="2563eb", fill_type="solid")
+            header_font = Font(bold=True, color="FFFFFF")
+            header_row = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.fill = header_fill
+                cell.font = header_font
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+                header_row.append(cell)
+            ws.append(header_row)
+            for row in export_rows():
+                ws.append(row)
+            wb.save(output)
         output.seek(0)
         
-        from flask import Response
-        return Response(
-            output.getvalue(),
+        return send_file(
+            output,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers={'Content-Disposition': f'attachment; filename=orders_export_{datetime.now().strftime("%Y%m%d")}.xlsx'}
+            as_attachment=True,
+            download_name=f'orders_export_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
         
     except Exception as e:
@@ -3709,7 +4120,7 @@ def advanced_search():
         if not user_id:
             return jsonify({'success': False, 'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
@@ -3732,55 +4143,57 @@ def advanced_search():
         }
         
         # Search orders
-        if user.role == 'mr':
-            orders = Order.query.filter_by(mr_id=user_id).all()
-        elif user.role == 'distributor':
-            mr_ids = [u.id for u in User.query.filter_by(role='mr', area=user.area).all()]
-            orders = Order.query.filter(Order.mr_id.in_(mr_ids)).all()
-        else:
-            orders = []
-        
-        # Filter orders by query
-        if query:
-            filtered_orders = []
-            for order in orders:
-                if (query in order.order_id.lower() or
-                    (order.customer and query in order.customer.name.lower()) or
-                    (order.mr and query in order.mr.name.lower())):
-                    filtered_orders.append(order)
+        if query and user.role in ('mr', 'distributor'):
+            pattern = f'%{query}%'
+            orders_query = Order.query.outerjoin(Order.customer).outerjoin(Order.mr).options(
+                contains_eager(Order.customer), contains_eager(Order.mr)
+            )
+            if user.role == 'mr':
+                orders_query = orders_query.filter(Order.mr_id == user_id)
+            else:
+                orders_query = orders_query.filter(Order.mr_id.in_(_mr_ids_subquery(user.area)))
+            filtered_orders = orders_query.filter(or_(
+                Order.order_id.ilike(pattern),
+                Customer.name.ilike(pattern),
+                User.name.ilike(pattern)
+            )).limit(20).all()
             results['orders'] = [{
                 'order_id': o.order_id,
                 'status': o.status,
                 'total_amount': float(o.total_amount) if o.total_amount else 0.0,
                 'order_date': o.created_at.strftime('%Y-%m-%d') if o.created_at else 'N/A',
                 'customer_name': o.customer.name if o.customer else None
-            } for o in filtered_orders[:20]]  # Limit to 20
+            } for o in filtered_orders]
         
         # Search products
-        if user.role == 'mr':
-            db_service = get_db_service()
-            products = db_service.get_products_from_dealer_stock(user.area)
-        else:
-            products = Product.query.all()
-        
         if query:
-            filtered_products = [p for p in products if query in (p.product_name or '').lower()]
+            if user.role == 'mr':
+                # Area stock list is already cached per area, so filter it in memory
+                db_service = get_db_service()
+                products = db_service.get_products_from_dealer_stock(user.area)
+                filtered_products = [p for p in products if query in (p.product_name or '').lower()][:20]
+            else:
+                filtered_products = Product.query.filter(
+                    Product.product_name.ilike(f'%{query}%')
+                ).limit(20).all()
             results['products'] = [{
                 'product_name': p.product_name,
                 'product_code': getattr(p, 'product_code', None),
                 'price': float(p.price) if p.price else 0.0
-            } for p in filtered_products[:20]]
+            } for p in filtered_products]
         
         # Search customers (for MRs)
         if user.role == 'mr' and query:
-            customers = Customer.query.filter_by(mr_id=user_id).all()
-            filtered_customers = [c for c in customers if query in c.name.lower() or query in c.unique_id.lower()]
+            filtered_customers = Customer.query.filter(
+                Customer.mr_id == user_id,
+                or_(Customer.name.ilike(f'%{query}%'), Customer.unique_id.ilike(f'%{query}%'))
+            ).limit(10).all()
             results['customers'] = [{
                 'name': c.name,
                 'unique_id': c.unique_id,
                 'email': c.email,
                 'phone': c.phone
-            } for c in filtered_customers[:10]]
+            } for c in filtered_customers]
         
         return jsonify({
             'success': True,
@@ -3803,7 +4216,7 @@ def reject_order_action():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Only distributors can reject orders'}), 403
         
@@ -3844,7 +4257,7 @@ def add_customer():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role not in ['mr', 'distributor']:
             return jsonify({'error': 'Only MRs and Dealers can add customers'}), 403
         
@@ -3880,33 +4293,24 @@ def add_customer():
         address = sanitize_string(address_raw, max_length=500) if address_raw else None
         
         # Create new customer linked to MR or Dealer
+        customer = {
+            'unique_id': Customer().generate_unique_id(),
+            'name': name,
+            'email': email if email else None,
+            'phone': phone if phone else None,
+            'address': address if address else None,
+            'is_active': True
+        }
         if user.role == 'mr':
-            customer = Customer(
-                name=name,
-                email=email if email else None,
-                phone=phone if phone else None,
-                address=address if address else None,
-                mr_unique_id=user.unique_id,
-                mr_id=user.id,
-                is_active=True
-            )
+            customer.update(mr_unique_id=user.unique_id, mr_id=user.id)
         else:  # distributor
-            customer = Customer(
-                name=name,
-                email=email if email else None,
-                phone=phone if phone else None,
-                address=address if address else None,
-                dealer_unique_id=user.unique_id,
-                dealer_id=user.id,
-                is_active=True
-            )
-        
-        # Generate unique ID
-        customer.generate_unique_id()
+            customer.update(dealer_unique_id=user.unique_id, dealer_id=user.id)
         
-        # Save to database
+        # Save to database: one INSERT returning the new id, no refresh SELECT after commit
         try:
-            db.session.add(customer)
+            customer['id'] = db.session.execute(
+                insert(Customer).values(**customer).returning(Customer.id)
+            ).scalar_one()
             db.session.commit()
         except Exception as e:
             logger.error(f"Error saving customer to database: {str(e)}")
@@ -3914,8 +4318,9 @@ def add_customer():
             raise
         
         # Store selected customer in session
-        session['selected_customer_id'] = customer.id
-        session['selected_customer_unique_id'] = customer.unique_id
+        session['selected_customer_id'] = customer['id']
+        session['selected_customer_unique_id'] = customer['unique_id']
+        session['selected_customer_name'] = customer['name']
         
         # Get available products for the MR
         db_service = get_db_service()
@@ -3925,26 +4330,26 @@ def add_customer():
             from app.models import Product
             products = Product.query.all()
         
-        # Build product list for interactive UI with FOC information using helper
+        # Build product list for interactive UI with FOC information using helper (cached across customer selections)
         pricing_service = get_pricing_service()
-        product_list = build_product_list_with_foc(products, pricing_service)
+        product_list = cached_product_list_with_foc(products, pricing_service)
         
         # Create response message with customer info
-        response = f"• Great! I can help you place an order.\n• **Ordering for:** {customer.name} ({customer.unique_id})\n• Please use the product selection form below to select products and quantities."
+        response = f"• Great! I can help you place an order.\n• **Ordering for:** {customer['name']} ({customer['unique_id']})\n• Please use the product selection form below to select products and quantities."
         
         # Save conversation
-        save_conversation(user.id, f"Added new customer: {customer.name}", response)
+        save_conversation(user.id, f"Added new customer: {customer['name']}", response)
         
         return jsonify({
             'success': True,
-            'message': f'Customer {customer.name} added successfully',
+            'message': f"Customer {customer['name']} added successfully",
             'customer': {
-                'id': customer.id,
-                'unique_id': customer.unique_id,
-                'name': customer.name,
-                'email': customer.email,
-                'phone': customer.phone,
-                'address': customer.address
+                'id': customer['id'],
+                'unique_id': customer['unique_id'],
+                'name': customer['name'],
+                'email': customer['email'],
+                'phone': customer['phone'],
+                'address': customer['address']
             },
             'response': response,
             'products': product_list,
@@ -3969,7 +4374,7 @@ def place_order():
         enhanced_order_service = get_enhanced_order_service()
         
         # Get user and customer details
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         customer_id = None
         delivery_partner_id = None
         
@@ -4028,9 +4433,11 @@ def place_order():
             if user and user.role == 'mr' and 'selected_customer_id' in session:
                 session.pop('selected_customer_id', None)
                 session.pop('selected_customer_unique_id', None)
+                session.pop('selected_customer_name', None)
             elif user and user.role == 'distributor':
                 session.pop('selected_customer_id', None)
                 session.pop('selected_customer_unique_id', None)
+                session.pop('selected_customer_name', None)
                 session.pop('selected_delivery_partner_id', None)
             
             return jsonify({
@@ -4061,7 +4468,7 @@ def add_to_cart_api():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -4090,13 +4497,7 @@ def add_to_cart_api():
         
         # Get product from dealer stock
         db_service = get_db_service()
-        products = db_service.get_products_from_dealer_stock(user.area)
-        
-        product = None
-        for p in products:
-            if p.get('product_code') == product_code:
-                product = p
-                break
+        product = db_service.get_product_from_dealer_stock(user.area, product_code)
         
         if not product:
             return jsonify({
@@ -4152,127 +4553,245 @@ def add_to_cart_api():
                     'error': message or 'Failed to add product to cart'
                 }), 200  # Return 200 with success: false so frontend can parse it
         except Exception as db_error:
-            logger.error(f"Database error adding to cart: {str(db_error)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Database error adding to cart: {str(db_error)}")
             return jsonify({
                 'success': False,
                 'error': f'Database error: {str(db_error)}'
             }), 200  # Return 200 with success: false so frontend can parse it
             
     except Exception as e:
-        logger.error(f"Error adding to cart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error adding to cart: {str(e)}")
         return jsonify({
             'success': False,
             'error': f'Error adding product to cart: {str(e)}'
         }), 200  # Return 200 with success: false so frontend can parse it
 
-@chatbot_bp.route('/cart', methods=['GET'])
-def get_cart():
-    """Get user's cart items"""
+@chatbot_bp.route('/cart/bulk_add', methods=['POST'])
+def bulk_add_to_cart_api():
+    """Add several products to cart in one request: {"items": [{"product_code", "quantity"}, ...]}"""
     try:
+        from app.input_validation import validate_and_sanitize_product_code
+        
         user_id = session.get('user_id')
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        db_service = get_db_service()
-        cart_items = db_service.get_cart_items(user_id)
-        cart_data = []
+        user = _load_current_user(user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
         
-        # Get pricing service to calculate FOC for cart items
-        from app.pricing_service import PricingService
-        pricing_service = PricingService()
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Invalid JSON or missing Content-Type header'}), 400
         
-        for item in cart_items:
-            # Get product name from cart item (now stored in CartItem) or fallback
-            product_name = item.product_code
-            if hasattr(item, 'product_name') and item.product_name:
-                product_name = item.product_name
-            elif hasattr(item, 'product') and item.product:
-                product_name = item.product.product_name
-            
-            # Calculate current pricing with FOC
-            if hasattr(item, 'product') and item.product:
-                pricing_result = pricing_service.calculate_product_pricing(item.product.id, item.quantity)
-                if 'error' not in pricing_result:
-                    scheme_info = pricing_result.get('scheme', {})
-                    pricing_info = pricing_result.get('pricing', {})
-                    free_quantity = scheme_info.get('free_quantity', 0)
-                    paid_quantity = scheme_info.get('paid_quantity', item.quantity)
-                    total_quantity = scheme_info.get('total_quantity', item.quantity)
-                    scheme_name = scheme_info.get('name')
-                    scheme_applied = scheme_info.get('applied', False)
-                    total_price = pricing_info.get('total_amount', item.total_price)
-                    final_price = pricing_info.get('final_price', item.unit_price)
-                else:
-                    # Fallback to cart item values
-                    free_quantity = getattr(item, 'free_quantity', 0)
-                    paid_quantity = item.quantity
-                    total_quantity = item.quantity
-                    scheme_name = None
-                    scheme_applied = False
-                    total_price = item.total_price
-                    final_price = item.unit_price
+        items_raw = data.get('items')
+        if not isinstance(items_raw, list) or not items_raw:
+            return jsonify({'error': 'Items list is required'}), 400
+        if len(items_raw) > 100:
+            return jsonify({'error': 'Too many items (maximum 100 per request)'}), 400
+        
+        db_service = get_db_service()
+        errors = []
+        # Repeated codes in one request are merged, like repeated single adds would be
+        requested = {}
+        for entry in items_raw:
+            if not isinstance(entry, dict):
+                errors.append({'product_code': None, 'error': 'Invalid item'})
+                continue
+            product_code = validate_and_sanitize_product_code(entry.get('product_code'))
+            if not product_code:
+                errors.append({'product_code': entry.get('product_code'), 'error': 'Invalid product code format'})
+                continue
+            if not validate_quantity(entry.get('quantity')):
+                errors.append({'product_code': product_code, 'error': 'Quantity must be a positive integer'})
+                continue
+            requested[product_code] = requested.get(product_code, 0) + int(entry.get('quantity'))
+        
+        products = {}
+        for product_code in requested:
+            product = db_service.get_product_from_dealer_stock(user.area, product_code)
+            if product:
+                products[product_code] = product
             else:
-                # Fallback to cart item values
-                free_quantity = getattr(item, 'free_quantity', 0)
-                paid_quantity = item.quantity
-                total_quantity = item.quantity
-                scheme_name = None
-                scheme_applied = False
-                total_price = item.total_price
-                final_price = item.unit_price
-            
-            cart_data.append({
-                'id': item.id,
-                'product_code': item.product_code,
-                'product_name': product_name,
-                'quantity': item.quantity,
-                'unit_price': item.unit_price,
-                'total_price': total_price,
-                'base_price': getattr(item, 'base_price', item.unit_price),
-                'discount_amount': getattr(item, 'discount_amount', 0),
-                'final_price': final_price,
-                'scheme_applied': scheme_applied,
-                'scheme_name': scheme_name,
-                'free_quantity': free_quantity,
-                'paid_quantity': paid_quantity,
-                'total_quantity': total_quantity
+                errors.append({
+                    'product_code': product_code,
+                    'error': f'Product with code "{product_code}" not found in your area.'
+                })
+        
+        pricing_service = get_pricing_service()
+        bulk_pricing = pricing_service.calculate_bulk_pricing(
+            [(product['product_id'], requested[code]) for code, product in products.items()]
+        )
+        
+        to_add = []
+        for product_code, product in products.items():
+            quantity = requested[product_code]
+            pricing = bulk_pricing.get((product['product_id'], quantity), {'error': 'Pricing unavailable'})
+            if 'error' in pricing:
+                errors.append({'product_code': product_code, 'error': pricing['error']})
+                continue
+            to_add.append({
+                'product_id': product['product_id'],
+                'product_code': product_code,
+                'product_name': product.get('product_name'),
+                'quantity': quantity,
+                'unit_price': pricing['pricing']['final_price']
             })
         
-        # Calculate subtotal, tax, and grand total
-        from flask import current_app
-        subtotal = sum(item['total_price'] for item in cart_data)
-        tax_rate = current_app.config.get('TAX_RATE', 0.05)  # Get from config, default 5%
-        tax_amount = subtotal * tax_rate
-        grand_total = subtotal + tax_amount
+        cart_items = db_service.add_many_to_cart(user_id, to_add) if to_add else []
+        logger.info(f"Bulk add to cart: {len(cart_items)} added, {len(errors)} rejected")
         
-        # Get customer info if available (for MRs)
-        customer_id = None
-        customer_name = ''
-        if 'selected_customer_id' in session:
-            customer_id = session.get('selected_customer_id')
-            from app.models import Customer
+        return jsonify({
+            'success': bool(cart_items),
+            'message': f'{len(cart_items)} item(s) added to cart',
+            'cart_items': [{
+                'id': cart_item.id,
+                'product_code': cart_item.product_code,
+                'product_name': cart_item.product_name,
+                'quantity': cart_item.quantity,
+                'unit_price': cart_item.unit_price
+            } for cart_item in cart_items],
+            'errors': errors
+        }), 200  # Return 200 with success: false so frontend can parse it
+        
+    except Exception as e:
+        logger.exception(f"Error bulk adding to cart: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Error adding products to cart: {str(e)}'
+        }), 200  # Return 200 with success: false so frontend can parse it
+
+def _serialize_cart_item(item, product_name, line_pricing=None):
+    """Response dict for a CartItem; line_pricing carries freshly computed prices for an edited line"""
+    line_pricing = line_pricing or {}
+    return {
+        'id': item.id,
+        'product_code': item.product_code,
+        'product_name': product_name,
+        'quantity': item.quantity,
+        'unit_price': item.unit_price,
+        'total_price': item.total_price,
+        'base_price': line_pricing.get('base_price', item.unit_price),
+        'discount_amount': line_pricing.get('discount_amount', 0),
+        'final_price': line_pricing.get('final_price', item.unit_price),
+        'scheme_applied': None,
+        'free_quantity': line_pricing.get('free_quantity', 0),
+        'paid_quantity': line_pricing.get('paid_quantity', item.quantity)
+    }
+
+def _priced_cart_line(row, pricing_result):
+    """Response dict for one cart row, using current pricing when available"""
+    if 'error' in pricing_result:
+        # Fallback to cart item values
+        return {
+            'id': row.id,
+            'product_code': row.product_code,
+            'product_name': row.product_name,
+            'quantity': row.quantity,
+            'unit_price': row.unit_price,
+            'total_price': row.total_price,
+            'base_price': row.unit_price,
+            'discount_amount': 0,
+            'final_price': row.unit_price,
+            'scheme_applied': False,
+            'scheme_name': None,
+            'free_quantity': 0,
+            'paid_quantity': row.quantity,
+            'total_quantity': row.quantity
+        }
+    scheme_info = pricing_result['scheme']
+    pricing_info = pricing_result['pricing']
+    return {
+        'id': row.id,
+        'product_code': row.product_code,
+        'product_name': row.product_name,
+        'quantity': row.quantity,
+        'unit_price': row.unit_price,
+        'total_price': pricing_info.get('total_amount', row.total_price),
+        'base_price': row.unit_price,
+        'discount_amount': 0,
+        'final_price': pricing_info.get('final_price', row.unit_price),
+        'scheme_applied': scheme_info.get('applied', False),
+        'scheme_name': scheme_info.get('name'),
+        'free_quantity': scheme_info.get('free_quantity', 0),
+        'paid_quantity': scheme_info.get('paid_quantity', row.quantity),
+        'total_quantity': scheme_info.get('total_quantity', row.quantity)
+    }
+
+def _build_cart_payload(user_id):
+    """Priced cart lines, totals and selected customer for the cart endpoints (cached briefly)"""
+    db_service = get_db_service()
+    
+    # The fingerprint changes on every cart add/update/remove, in any worker; repricing
+    # from stock/FOC changes is picked up when the entry expires
+    cache_key = (
+        user_id,
+        db_service.get_cart_fingerprint(user_id),
+        session.get('selected_customer_id'),
+        session.get('selected_customer_name')
+    )
+    cacheable = cache_key[1] is not None
+    cached_payload = _cart_response_cache.get(cache_key) if cacheable else None
+    if cached_payload is not None:
+        return cached_payload
+    
+    cart_rows = db_service.get_cart_rows(user_id)
+    
+    # Price every line (with FOC) in one batch
+    pricing_service = get_pricing_service()
+    bulk_pricing = pricing_service.calculate_bulk_pricing(
+        [(row.product_id, row.quantity) for row in cart_rows if row.product_id]
+    )
+    no_pricing = {'error': 'Pricing unavailable'}
+    cart_data = [
+        _priced_cart_line(row, bulk_pricing.get((row.product_id, int(row.quantity)), no_pricing))
+        for row in cart_rows
+    ]
+    
+    # Calculate subtotal, tax, and grand total
+    subtotal = sum(item['total_price'] for item in cart_data)
+    tax_rate = _tax_rate()
+    tax_amount = subtotal * tax_rate
+    grand_total = subtotal + tax_amount
+    
+    # Get customer info if available (for MRs)
+    customer_id = None
+    customer_name = ''
+    if 'selected_customer_id' in session:
+        customer_id = session.get('selected_customer_id')
+        customer_name = session.get('selected_customer_name')
+        if customer_name is None:
+            # Selected before the name was kept in the session
             customer = Customer.query.get(customer_id)
+            customer_name = customer.name if customer else ''
             if customer:
-                customer_name = customer.name
+                session['selected_customer_name'] = customer_name
+    
+    payload = {
+        'cart_items': cart_data,
+        'subtotal': round(subtotal, 2),
+        'tax_rate': tax_rate,
+        'tax_amount': round(tax_amount, 2),
+        'grand_total': round(grand_total, 2),
+        'customer_id': customer_id,
+        'customer_name': customer_name
+    }
+    if cacheable:
+        _cart_response_cache.set(cache_key, payload)
+    return payload
+
+@chatbot_bp.route('/cart', methods=['GET'])
+def get_cart():
+    """Get user's cart items"""
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'User not logged in'}), 401
         
-        return jsonify({
-            'cart_items': cart_data,
-            'subtotal': round(subtotal, 2),
-            'tax_rate': tax_rate,
-            'tax_amount': round(tax_amount, 2),
-            'grand_total': round(grand_total, 2),
-            'customer_id': customer_id,
-            'customer_name': customer_name
-        }), 200
+        return jsonify(_build_cart_payload(user_id)), 200
         
     except Exception as e:
-        logger.error(f"Error getting cart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error getting cart: {str(e)}")
         return jsonify({'error': f'Error getting cart: {str(e)}'}), 500
 
 @chatbot_bp.route('/cart/<int:item_id>', methods=['DELETE'])
@@ -4288,7 +4807,7 @@ def remove_from_cart(item_id):
         # Get cart item before removing to unblock quantities for MR orders
         cart_item = CartItem.query.get(item_id)
         if cart_item:
-            user = User.query.get(user_id)
+            user = _load_current_user(user_id)
             # Unblock quantities for MR orders when removing from cart
             if user and user.role == 'mr' and user.area and cart_item:
                 enhanced_order_service = get_enhanced_order_service()
@@ -4302,46 +4821,8 @@ def remove_from_cart(item_id):
         success, message = db_service.remove_from_cart(item_id)
         
         if success:
-            # Return updated cart items (even if empty)
-            cart_items = db_service.get_cart_items(user_id)
-            cart_data = []
-            for item in cart_items:
-                # Get product name from cart item (now stored in CartItem) or fallback
-                product_name = item.product_code
-                if hasattr(item, 'product_name') and item.product_name:
-                    product_name = item.product_name
-                elif hasattr(item, 'product') and item.product:
-                    product_name = item.product.product_name
-                
-                cart_data.append({
-                    'id': item.id,
-                    'product_code': item.product_code,
-                    'product_name': product_name,
-                    'quantity': item.quantity,
-                    'unit_price': item.unit_price,
-                    'total_price': item.total_price,
-                    'base_price': getattr(item, 'base_price', item.unit_price),
-                    'discount_amount': getattr(item, 'discount_amount', 0),
-                    'final_price': getattr(item, 'final_price', item.unit_price),
-                    'scheme_applied': getattr(item, 'scheme_applied', None),
-                    'free_quantity': getattr(item, 'free_quantity', 0),
-                    'paid_quantity': getattr(item, 'paid_quantity', item.quantity)
-                })
-            
-            # Calculate totals
-            subtotal = sum(item.get('total_price', 0) for item in cart_data)
-            from flask import current_app
-            tax_rate = current_app.config.get('TAX_RATE', 0.05)  # Get from config, default 5%
-            tax_amount = subtotal * tax_rate
-            grand_total = subtotal + tax_amount
-            
-            return jsonify({
-                'message': message, 
-                'cart_items': cart_data,
-                'subtotal': subtotal,
-                'tax_amount': tax_amount,
-                'grand_total': grand_total
-            }), 200
+            # Return updated cart items (even if empty), priced the same way as GET /cart
+            return jsonify(dict(_build_cart_payload(user_id), message=message)), 200
         else:
             return jsonify({'error': message}), 400
             
@@ -4376,27 +4857,26 @@ def update_cart_quantity(item_id):
             return jsonify({'error': 'Product not found'}), 404
         
         # Check stock availability - for MR users, get from dealer stock
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         available_quantity = 0
         if user and user.role == 'mr' and user.area:
             # Get available quantity from dealer stock
             from app.models import DealerWiseStockDetails
             from datetime import date
             today = date.today()
-            dealers_in_area = User.query.filter_by(role='distributor', area=user.area).all()
-            if dealers_in_area:
-                stock_details = DealerWiseStockDetails.query.filter(
-                    DealerWiseStockDetails.product_code == cart_item.product_code,
-                    DealerWiseStockDetails.status == 'confirmed',
-                    DealerWiseStockDetails.dealer_unique_id.in_([d.unique_id for d in dealers_in_area]),
-                    DealerWiseStockDetails.available_for_sale > 0
-                ).filter(
-                    db.or_(
-                        DealerWiseStockDetails.expiry_date >= today,
-                        DealerWiseStockDetails.expiry_date.is_(None)
-                    )
-                ).all()
-                available_quantity = sum(s.available_for_sale for s in stock_details)
+            available_quantity = db.session.query(
+                func.coalesce(func.sum(DealerWiseStockDetails.available_for_sale), 0)
+            ).filter(
+                DealerWiseStockDetails.product_code == cart_item.product_code,
+                DealerWiseStockDetails.status == 'confirmed',
+                DealerWiseStockDetails.dealer_unique_id.in_(_dealer_ids_subquery(user.area)),
+                DealerWiseStockDetails.available_for_sale > 0
+            ).filter(
+                db.or_(
+                    DealerWiseStockDetails.expiry_date >= today,
+                    DealerWiseStockDetails.expiry_date.is_(None)
+                )
+            ).scalar()
         else:
             # For non-MR users, use product available_for_sale if it exists
             available_quantity = getattr(product, 'available_for_sale', 999999)
@@ -4429,7 +4909,6 @@ def update_cart_quantity(item_id):
         
         # Update quantity
         cart_item.quantity = new_quantity
-        cart_item.paid_quantity = new_quantity
         
         # Recalculate pricing
         pricing_service = get_pricing_service()
@@ -4438,45 +4917,39 @@ def update_cart_quantity(item_id):
         if 'error' in pricing:
             return jsonify({'error': pricing['error']}), 400
         
-        # Update cart item pricing
-        cart_item.base_price = pricing['base_price']
-        cart_item.discount_amount = pricing['discount']['amount']
-        cart_item.final_price = pricing['pricing']['final_price']
-        cart_item.free_quantity = pricing['scheme']['free_quantity']
-        cart_item.paid_quantity = pricing['scheme']['paid_quantity']
-        cart_item.total_price = cart_item.final_price * cart_item.paid_quantity
+        # Update cart item pricing; only total_price is stored, the rest is returned for the edited line
+        line_pricing = {
+            'base_price': pricing['base_price'],
+            'discount_amount': pricing['discount']['amount'],
+            'final_price': pricing['pricing']['final_price'],
+            'free_quantity': pricing['scheme']['free_quantity'],
+            'paid_quantity': pricing['scheme']['paid_quantity']
+        }
+        cart_item.total_price = line_pricing['final_price'] * line_pricing['paid_quantity']
         
         db.session.commit()
         
         # Return updated cart items
-        cart_items = db_service.get_cart_items(user_id)
-        cart_data = []
-        for item in cart_items:
-            # Get product name from cart item (now stored in CartItem) or fallback
-            product_name = item.product_code
-            if hasattr(item, 'product_name') and item.product_name:
-                product_name = item.product_name
-            elif hasattr(item, 'product') and item.product:
-                product_name = item.product.product_name
-            
-            cart_data.append({
-                'id': item.id,
-                'product_code': item.product_code,
-                'product_name': product_name,
-                'quantity': item.quantity,
-                'unit_price': item.unit_price,
-                'total_price': item.total_price,
-                'base_price': getattr(item, 'base_price', item.unit_price),
-                'discount_amount': getattr(item, 'discount_amount', 0),
-                'final_price': getattr(item, 'final_price', item.unit_price),
-                'scheme_applied': getattr(item, 'scheme_applied', None),
-                'free_quantity': getattr(item, 'free_quantity', 0),
-                'paid_quantity': getattr(item, 'paid_quantity', item.quantity)
-            })
+        cart_items = CartItem.query.filter_by(user_id=user_id).all()
+        # Catalogue names only for lines without a stored name, in one query
+        missing_name_ids = {item.product_id for item in cart_items if not item.product_name}
+        catalogue_names = {}
+        if missing_name_ids:
+            catalogue_names = dict(db.session.query(Product.id, Product.product_name).filter(
+                Product.id.in_(missing_name_ids)
+            ).all())
+        cart_data = [
+            _serialize_cart_item(
+                item,
+                item.product_name or catalogue_names.get(item.product_id) or item.product_code,
+                line_pricing if item.id == cart_item.id else None
+            )
+            for item in cart_items
+        ]
         
-        # Calculate totals
-        subtotal = sum(item.get('total_price', 0) for item in cart_data)
-        tax_amount = subtotal * 0.05  # 5% tax
+        # Calculate totals from the stored line totals in SQL
+        subtotal, _ = db_service.get_cart_totals(user_id)
+        tax_amount = subtotal * _tax_rate()
         grand_total = subtotal + tax_amount
         
         return jsonify({
@@ -4500,7 +4973,7 @@ def get_quick_stats():
         if not user_id:
             return jsonify({'success': False, 'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
@@ -4510,29 +4983,29 @@ def get_quick_stats():
             'cartItems': 0
         }
         
+        # CASE rather than COUNT(...) FILTER, which SQL Server does not support
+        pending_count = func.coalesce(func.sum(case((Order.status == 'pending', 1), else_=0)), 0)
+        
         if user.role == 'mr':
-            # Count pending orders for this MR
-            from app.models import Order
-            stats['pendingOrders'] = Order.query.filter_by(
-                mr_id=user_id,
-                status='pending'
-            ).count()
-            stats['totalOrders'] = Order.query.filter_by(mr_id=user_id).count()
+            # Pending and total orders for this MR in one aggregate
+            pending, total = db.session.query(pending_count, func.count(Order.id)).filter(
+                Order.mr_id == user_id
+            ).one()
+            stats['pendingOrders'] = int(pending)
+            stats['totalOrders'] = int(total)
             
             # Count cart items
-            from app.models import CartItem
-            stats['cartItems'] = CartItem.query.filter_by(user_id=user_id).count()
+            stats['cartItems'] = db.session.query(func.count(CartItem.id)).filter(
+                CartItem.user_id == user_id
+            ).scalar()
             
         elif user.role == 'distributor':
-            # Count pending orders in distributor's area
-            from app.models import Order, User as UserModel
-            mr_ids_in_area = [u.id for u in UserModel.query.filter_by(role='mr', area=user.area).all()]
-            if mr_ids_in_area:
-                stats['pendingOrders'] = Order.query.filter(
-                    Order.mr_id.in_(mr_ids_in_area),
-                    Order.status == 'pending'
-                ).count()
-                stats['totalOrders'] = Order.query.filter(Order.mr_id.in_(mr_ids_in_area)).count()
+            # Pending and total orders in distributor's area
+            pending, total = db.session.query(pending_count, func.count(Order.id)).filter(
+                Order.mr_id.in_(_mr_ids_subquery(user.area))
+            ).one()
+            stats['pendingOrders'] = int(pending)
+            stats['totalOrders'] = int(total)
         
         return jsonify({
             'success': True,
@@ -4552,7 +5025,7 @@ def get_products_api():
             return jsonify({'error': 'User not logged in'}), 401
         
         db_service = get_db_service()
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -4561,20 +5034,9 @@ def get_products_api():
         area = user.area if user else None
         
         if user.role == 'mr' and area:
-            products = db_service.get_products_from_dealer_stock(area)
-        else:
-            warehouse = db_service.get_warehouse_by_area(area) if area else None
-            if warehouse:
-                products = db_service.get_products_by_warehouse(warehouse.id)
-            else:
-                products = Product.query.all()
-        
-        product_list = []
-        for product in products:
-            # Handle both Product objects and dictionaries from dealer stock
-            if isinstance(product, dict):
-                # Already a dictionary from dealer stock
-                product_list.append({
+            # Already aggregated per product by the dealer stock query
+            product_list = [
+                {
                     'product_code': product.get('product_code', ''),
                     'product_name': product.get('product_name', ''),
                     'product_description': '',
@@ -4583,19 +5045,25 @@ def get_products_api():
                     'sales_price': float(product.get('sales_price', 0)),
                     'batch_number': '',
                     'expiry_date': product.get('earliest_expiry')
-                })
-            else:
-                # Product object from database
-                product_list.append({
-                    'product_code': str(product.id),  # Use ID as code for new schema
-                    'product_name': product.product_name,
+                }
+                for product in db_service.get_products_from_dealer_stock(area)
+            ]
+        else:
+            product_list = [
+                {
+                    'product_code': str(product_id),  # Use ID as code for new schema
+                    'product_name': product_name,
                     'product_description': '',
-                    'price_of_product': float(product.price) if product.price else 0.0,
+                    'price_of_product': float(price) if price else 0.0,
                     'available_for_sale': 0,  # Will be calculated from dealer stock
-                    'sales_price': float(product.price) if product.price else 0.0,
+                    'sales_price': float(price) if price else 0.0,
                     'batch_number': '',
                     'expiry_date': None
-                })
+                }
+                for product_id, product_name, price in db.session.query(
+                    Product.id, Product.product_name, Product.price
+                ).all()
+            ]
         
         return jsonify({'products': product_list}), 200
         
@@ -4614,7 +5082,7 @@ def distributor_confirm_order():
         if not distributor_user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(distributor_user_id)
+        user = _load_current_user(distributor_user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Distributor access required.'}), 403
         
@@ -4653,7 +5121,7 @@ def get_pending_stock_arrivals():
         if not dealer_user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(dealer_user_id)
+        user = _load_current_user(dealer_user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Distributor access required.'}), 403
         
@@ -4684,7 +5152,7 @@ def confirm_stock_arrival():
         if not dealer_user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(dealer_user_id)
+        user = _load_current_user(dealer_user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Distributor access required.'}), 403
         
@@ -4726,7 +5194,7 @@ def adjust_stock_quantity():
         if not dealer_user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(dealer_user_id)
+        user = _load_current_user(dealer_user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Distributor access required.'}), 403
         
@@ -4768,9 +5236,6 @@ def adjust_stock_quantity():
 def handle_company_requests(user_message, user):
     """Handle all company user requests for report generation"""
     try:
-        from app.company_report_service import CompanyReportService
-        report_service = CompanyReportService()
-        
         message_lower = user_message.lower().strip()
         
         # Check for report generation keywords
@@ -4779,7 +5244,7 @@ def handle_company_requests(user_message, user):
         
         if any(keyword in message_lower for keyword in report_keywords) or message_lower == 'generate report':
             # Show table selection
-            available_tables = report_service.get_available_tables()
+            available_tables = _available_tables()
             
             response = f"""**📊 Database Report Generation**
 
@@ -4908,8 +5373,6 @@ What would you like to do?"""
 def select_company_table():
     """Handle company table selection for report generation"""
     try:
-        from app.company_report_service import CompanyReportService
-        
         data = request.json
         table_key = data.get('table_key')
         user_id = session.get('user_id')
@@ -4917,12 +5380,11 @@ def select_company_table():
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'company':
             return jsonify({'error': 'Unauthorized'}), 403
         
-        report_service = CompanyReportService()
-        available_tables = report_service.get_available_tables()
+        available_tables = _available_tables()
         
         if table_key not in available_tables:
             return jsonify({'error': 'Invalid table'}), 400
@@ -4980,7 +5442,7 @@ def generate_company_report():
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'company':
             return jsonify({'error': 'Unauthorized'}), 403
         
@@ -5276,7 +5738,7 @@ def get_delivery_partners():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Only distributors can view delivery partners'}), 403
         
@@ -5326,7 +5788,7 @@ def get_delivery_partner_orders():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'delivery_partner':
             return jsonify({'error': 'Only delivery partners can view assigned orders'}), 403
         
@@ -5392,7 +5854,7 @@ def mark_order_delivered():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'delivery_partner':
             return jsonify({'error': 'Only delivery partners can mark orders as delivered'}), 403
         
@@ -5430,7 +5892,7 @@ def set_delivery_partner_in_session():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Dealer access required.'}), 403
         
@@ -5462,7 +5924,7 @@ def get_dealer_customers():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Dealer access required.'}), 403
         
@@ -5500,7 +5962,7 @@ def add_dealer_customer():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Dealer access required.'}), 403
         
@@ -5584,7 +6046,7 @@ def get_dealer_delivery_partners():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Dealer access required.'}), 403
         
@@ -5627,7 +6089,7 @@ def add_delivery_partner():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user or user.role != 'distributor':
             return jsonify({'error': 'Access denied. Dealer access required.'}), 403
         
@@ -5711,7 +6173,7 @@ def get_orders_with_filters():
         if not user_id:
             return jsonify({'error': 'User not logged in'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_current_user(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -5742,11 +6204,10 @@ def get_orders_with_filters():
                 # Get all MRs and customers in dealer's area
                 if user.area:
                     # Orders from MRs in this area
-                    mr_ids = [mr.id for mr in User.query.filter_by(role='mr', area=user.area).all()]
                     # Orders where dealer is the creator
                     dealer_created = Order.created_by_id == user.id
                     # Orders from MRs in the same area
-                    mr_created = Order.mr_id.in_(mr_ids) if mr_ids else False
+                    mr_created = Order.mr_id.in_(_mr_ids_subquery(user.area))
                     
                     from sqlalchemy import or_
                     query = query.filter(or_(dealer_created, mr_created))
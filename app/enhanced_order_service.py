@@ -980,8 +980,7 @@ These products will be automatically ordered when new stock arrives. Track with
                 
                 # Get actual available stock
                 from app.models import DealerWiseStockDetails
-                dealers_in_area = User.query.filter_by(role='distributor', area=order.mr.area).all()
-                dealer_unique_ids = [d.unique_id for d in dealers_in_area] if dealers_in_area else []
+                dealer_unique_ids = self.db_service.get_dealer_unique_ids_by_area(order.mr.area)
                 
                 # First, try to get blocked stock (stock that was reserved for this order)
                 stock_details = DealerWiseStockDetails.query.filter(
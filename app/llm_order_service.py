@@ -10,6 +10,12 @@ from app.models import Product
 # Single logger initialization - removed duplicate
 logger = logging.getLogger(__name__)
 
+def compute_order_totals(line_totals, tax_rate):
+    """Return (subtotal, tax_amount, grand_total) for a list of line totals"""
+    subtotal = sum(line_totals)
+    tax_amount = subtotal * tax_rate
+    return subtotal, tax_amount, subtotal + tax_amount
+
 class LLMOrderService:
     """Enhanced LLM service for order processing and product extraction"""
     
@@ -503,7 +509,6 @@ If the user's message is unclear or doesn't contain specific order details, set
         try:
             # Calculate pricing for all items
             pricing_details = []
-            total_amount = 0
             
             for item in cart_items:
                 pricing = self.pricing_service.calculate_product_pricing(
@@ -516,7 +521,6 @@ If the user's message is unclear or doesn't contain specific order details, set
                     self.logger.info(f"Pricing for {pricing['product_code']}: Qty={pricing['quantity']}, "
                                    f"Unit Price=${pricing['pricing']['final_price']}, Total Amount=${pricing['pricing']['total_amount']}")
                     pricing_details.append(pricing)
-                    total_amount += pricing['pricing']['total_amount']
                 else:
                     # Log error but still try to include item in table with error message
                     self.logger.warning(f"Pricing error for cart item {item.id} (product_id: {item.product_id}): {pricing.get('error', 'Unknown error')}")
@@ -543,6 +547,7 @@ If the user's message is unclear or doesn't contain specific order details, set
                 self.logger.warning(f"⚠️ MISMATCH: {len(cart_items)} cart items but only {len(pricing_details)} pricing details!")
             
             item_count = 0
+            line_totals = []
             for pricing in pricing_details:
                 item_count += 1
                 self.logger.info(f"Adding table row #{item_count}: {pricing.get('product_code', 'N/A')} - Qty: {pricing.get('quantity', 0)}")
@@ -585,6 +590,8 @@ If the user's message is unclear or doesn't contain specific order details, set
                     self.logger.warning(f"Minor pricing rounding difference for {pricing['product_code']}: "
                                       f"total_amount={total_amt} vs calculated={calculated_total} (diff: {abs(total_amt - calculated_total):.4f})")
                 
+                line_totals.append(total_amt)
+                
                 # Simplified table: Product | Quantity | Unit Price | Total Amount
                 pricing_info += f"| {product_display} | {quantity_display} | ${unit_price:.2f} | ${total_amt:.2f} |\n"
             
@@ -616,8 +623,7 @@ User Information:
             # Calculate tax and grand total
             from flask import current_app
             tax_rate = current_app.config.get('TAX_RATE', 0.05)  # Get from config, default 5%
-            tax_amount = total_amount * tax_rate
-            grand_total = total_amount + tax_amount
+            total_amount, tax_amount, grand_total = compute_order_totals(line_totals, tax_rate)
 
             summary_prompt = f"""You are Quantum Blue's AI assistant generating a concise order summary for HV (Powered by Quantum Blue AI).
 
@@ -6,6 +6,10 @@ import uuid
 class User(UserMixin, db.Model):
     """User model for HV - Dealers and MRs"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # MR/distributor lookups by area
+        db.Index('ix_users_role_area', 'role', 'area'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     unique_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -194,6 +198,30 @@ class FOC(db.Model):
 class DealerWiseStockDetails(db.Model):
     """Model to track stock dispatched from company to dealers"""
     __tablename__ = 'dealer_wise_stock_details'
+    __table_args__ = (
+        # FEFO lookup of blocked stock per product/dealer, earliest expiry first
+        db.Index(
+            'ix_dws_fefo', 'product_code', 'status', 'dealer_unique_id', 'expiry_date',
+            mssql_where=db.text('blocked_quantity > 0'),
+            postgresql_where=db.text('blocked_quantity > 0'),
+            sqlite_where=db.text('blocked_quantity > 0')
+        ),
+        # Sellable stock per area (dealer ids of the area) and per product code within it
+        db.Index(
+            'ix_dws_dealer_status_code', 'dealer_unique_id', 'status', 'product_code',
+            mssql_where=db.text('available_for_sale > 0'),
+            postgresql_where=db.text('available_for_sale > 0'),
+            sqlite_where=db.text('available_for_sale > 0')
+        ),
+        # Sellable quantity of one product across an area's dealers, expiry checked in the index
+        db.Index(
+            'ix_dws_code_status_dealer', 'product_code', 'status', 'dealer_unique_id', 'expiry_date',
+            mssql_where=db.text('available_for_sale > 0'),
+            mssql_include=['available_for_sale'],
+            postgresql_where=db.text('available_for_sale > 0'),
+            sqlite_where=db.text('available_for_sale > 0')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     dispatch_date = db.Column(db.Date, nullable=False)
@@ -265,6 +293,12 @@ class DealerWiseStockDetails(db.Model):
 class Order(db.Model):
     """Order model"""
     __tablename__ = 'orders'
+    __table_args__ = (
+        # MR order listings and their customer filter
+        db.Index('ix_orders_mr_id_customer_id', 'mr_id', 'customer_id'),
+        # Per-MR status counts and listings
+        db.Index('ix_orders_mr_id_status', 'mr_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -429,6 +463,10 @@ class Conversation(db.Model):
 class CartItem(db.Model):
     """Cart item model for managing user shopping cart"""
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # Cart reads, totals and fingerprints are all per user
+        db.Index('ix_cart_items_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
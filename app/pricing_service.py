@@ -1,12 +1,46 @@
 import logging
 import json
+import re
 from datetime import datetime
+from sqlalchemy import event
 from app import db
 from app.models import Product, FOC
+from app.cache_utils import TTLCache
 
 # Single logger initialization - removed duplicate
 logger = logging.getLogger(__name__)
 
+# Active FOC schemes rarely change; keep detached copies for a few minutes
+_active_focs_cache = TTLCache(maxsize=1, ttl=300)
+
+
+@event.listens_for(FOC, 'after_insert')
+@event.listens_for(FOC, 'after_update')
+@event.listens_for(FOC, 'after_delete')
+def _on_foc_change(mapper, connection, target):
+    """Any ORM write to FOC schemes invalidates the cached list"""
+    _active_focs_cache.clear()
+
+
+def get_active_focs():
+    """Active FOC schemes as session-independent copies, cached"""
+    focs = _active_focs_cache.get('active')
+    if focs is None:
+        focs = [
+            FOC(
+                id=f.id,
+                product_id=f.product_id,
+                product_name=f.product_name,
+                scheme_1=f.scheme_1,
+                scheme_2=f.scheme_2,
+                scheme_3=f.scheme_3,
+                is_active=f.is_active
+            )
+            for f in FOC.query.filter_by(is_active=True).all()
+        ]
+        _active_focs_cache.set('active', focs)
+    return focs
+
 class PricingService:
     """Service for calculating product pricing with discounts and schemes"""
     
@@ -49,58 +83,7 @@ class PricingService:
             
             # Check for FOC (Free of Cost) schemes
             foc_info = self._get_foc_for_product(product, quantity)
-            
-            # Calculate pricing based on FOC
-            if foc_info['scheme_applied']:
-                # Customer pays for ordered quantity, gets free items
-                paid_quantity = foc_info['paid_quantity']
-                free_quantity = foc_info['free_quantity']
-                total_quantity = foc_info['total_quantity']
-                
-                final_price = sales_price
-                total_amount = sales_price * paid_quantity  # Pay only for ordered quantity
-                
-                self.logger.info(f"FOC applied for product {product.id} ({product.product_name}): Order {quantity}, Get {free_quantity} free, Total: {total_quantity}")
-            else:
-                # No FOC scheme applies
-                paid_quantity = quantity
-                free_quantity = 0
-                total_quantity = quantity
-                final_price = sales_price
-                total_amount = sales_price * quantity
-            
-            result = {
-                'product_id': product_id,
-                'product_code': str(product.id),  # Use product.id as code since product_code field removed
-                'product_name': product.product_name,
-                'base_price': round(sales_price, 2),
-                'quantity': quantity,
-                'discount': {
-                    'type': None,
-                    'value': 0,
-                    'name': None,
-                    'amount': 0,
-                    'percentage': 0
-                },
-                'scheme': {
-                    'type': 'foc' if foc_info['scheme_applied'] else None,
-                    'value': foc_info.get('scheme_name'),
-                    'name': foc_info.get('scheme_name'),
-                    'applied': foc_info['scheme_applied'],
-                    'free_quantity': free_quantity,
-                    'paid_quantity': paid_quantity,
-                    'total_quantity': total_quantity
-                },
-                'pricing': {
-                    'price_after_discount': round(sales_price, 2),
-                    'final_price': round(final_price, 2),
-                    'total_amount': round(total_amount, 2),
-                    'savings': round(free_quantity * sales_price, 2) if free_quantity > 0 else 0
-                }
-            }
-            
-            self.logger.info(f"Pricing calculated for product {product.id} ({product.product_name}): ${total_amount:.2f} (sales_price: ${sales_price:.2f} x {paid_quantity} paid, {free_quantity} free)")
-            return result
+            return self._build_pricing_result(product_id, product, quantity, sales_price, foc_info)
             
         except Exception as e:
             self.logger.error(f"Error calculating pricing for product {product_id}: {str(e)}")
@@ -110,72 +93,149 @@ class PricingService:
                 'total_amount': 0
             }
     
+    def calculate_bulk_pricing(self, items):
+        """
+        Calculate pricing for many (product_id, quantity) pairs at once
+        Returns: dict of (product_id, quantity) -> pricing result (same shape as calculate_product_pricing)
+        """
+        try:
+            items = [(product_id, int(quantity)) for product_id, quantity in items]
+            product_ids = {product_id for product_id, _ in items}
+            if not product_ids:
+                return {}
+
+            from app.models import DealerWiseStockDetails
+            from sqlalchemy import desc
+
+            products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids)).all()}
+
+            # Latest confirmed sales_price per product, newest row first
+            latest_prices = {}
+            stock_rows = DealerWiseStockDetails.query.with_entities(
+                DealerWiseStockDetails.product_id,
+                DealerWiseStockDetails.sales_price
+            ).filter(
+                DealerWiseStockDetails.product_id.in_(product_ids),
+                DealerWiseStockDetails.status == 'confirmed'
+            ).order_by(desc(DealerWiseStockDetails.confirmed_at)).all()
+            for product_id, sales_price in stock_rows:
+                latest_prices.setdefault(product_id, sales_price)
+
+            active_focs = get_active_focs()
+            focs_by_product = {}
+            for f in active_focs:
+                if f.product_id is not None:
+                    focs_by_product.setdefault(f.product_id, f)
+
+            results = {}
+            for product_id, quantity in items:
+                product = products.get(product_id)
+                if not product:
+                    results[(product_id, quantity)] = {
+                        'error': 'Product not found',
+                        'final_price': 0,
+                        'total_amount': 0
+                    }
+                    continue
+
+                latest_price = latest_prices.get(product_id)
+                if latest_price:
+                    sales_price = float(latest_price)
+                else:
+                    sales_price = float(product.price) if product.price else 0.0
+
+                foc = focs_by_product.get(product_id) or self._match_foc_by_name(product, active_focs)
+                if foc:
+                    foc_info = foc.get_foc_for_quantity(quantity)
+                else:
+                    foc_info = {
+                        'free_quantity': 0,
+                        'paid_quantity': quantity,
+                        'total_quantity': quantity,
+                        'scheme_applied': False
+                    }
+                results[(product_id, quantity)] = self._build_pricing_result(product_id, product, quantity, sales_price, foc_info)
+
+            return results
+
+        except Exception as e:
+            self.logger.error(f"Error calculating bulk pricing: {str(e)}")
+            return {}
+
+    def _build_pricing_result(self, product_id, product, quantity, sales_price, foc_info):
+        """Build the pricing dict for a product from its sales price and FOC info"""
+        # Calculate pricing based on FOC
+        if foc_info['scheme_applied']:
+            # Customer pays for ordered quantity, gets free items
+            paid_quantity = foc_info['paid_quantity']
+            free_quantity = foc_info['free_quantity']
+            total_quantity = foc_info['total_quantity']
+            
+            final_price = sales_price
+            total_amount = sales_price * paid_quantity  # Pay only for ordered quantity
+            
+            self.logger.info(f"FOC applied for product {product.id} ({product.product_name}): Order {quantity}, Get {free_quantity} free, Total: {total_quantity}")
+        else:
+            # No FOC scheme applies
+            paid_quantity = quantity
+            free_quantity = 0
+            total_quantity = quantity
+            final_price = sales_price
+            total_amount = sales_price * quantity
+        
+        result = {
+            'product_id': product_id,
+            'product_code': str(product.id),  # Use product.id as code since product_code field removed
+            'product_name': product.product_name,
+            'base_price': round(sales_price, 2),
+            'quantity': quantity,
+            'discount': {
+                'type': None,
+                'value': 0,
+                'name': None,
+                'amount': 0,
+                'percentage': 0
+            },
+            'scheme': {
+                'type': 'foc' if foc_info['scheme_applied'] else None,
+                'value': foc_info.get('scheme_name'),
+                'name': foc_info.get('scheme_name'),
+                'applied': foc_info['scheme_applied'],
+                'free_quantity': free_quantity,
+                'paid_quantity': paid_quantity,
+                'total_quantity': total_quantity
+            },
+            'pricing': {
+                'price_after_discount': round(sales_price, 2),
+                'final_price': round(final_price, 2),
+                'total_amount': round(total_amount, 2),
+                'savings': round(free_quantity * sales_price, 2) if free_quantity > 0 else 0
+            }
+        }
+        
+        self.logger.info(f"Pricing calculated for product {product.id} ({product.product_name}): ${total_amount:.2f} (sales_price: ${sales_price:.2f} x {paid_quantity} paid, {free_quantity} free)")
+        return result
+    
     def _get_foc_for_product(self, product, quantity):
         """
         Get FOC (Free of Cost) information for a product
         Returns: dict with FOC details
         """
         try:
-            # Helper function to normalize product names for matching
-            def normalize_product_name(name):
-                """Normalize product name for matching (remove packaging, dosage, etc.)"""
-                if not name:
-                    return ""
-                normalized = name.upper().strip()
-                # Remove packaging info in parentheses
-                if '(' in normalized:
-                    normalized = normalized.split('(')[0].strip()
-                # Remove dosage info (mg, etc.)
-                normalized = normalized.replace('MG', '').replace('MG', '').strip()
-                # Replace hyphens and underscores with spaces
-                normalized = normalized.replace('-', ' ').replace('_', ' ')
-                # Remove extra spaces
-                normalized = ' '.join(normalized.split())
-                return normalized
+            active_focs = get_active_focs()
             
             # First try to find FOC by product_id (most reliable)
             foc = None
             if hasattr(product, 'id') and product.id:
-                foc = FOC.query.filter_by(product_id=product.id, is_active=True).first()
+                foc = next((f for f in active_focs if f.product_id == product.id), None)
             
             # Fallback: Try normalized name matching (handles "Arova 20" vs "Arova 20mg (3*10's)")
             if not foc:
-                product_normalized = normalize_product_name(product.product_name)
-                all_foc = FOC.query.filter_by(is_active=True).all()
-                
-                for f in all_foc:
-                    foc_normalized = normalize_product_name(f.product_name)
-                    
-                    # Exact normalized match
-                    if foc_normalized == product_normalized:
-                        foc = f
-                        break
-                    
-                    # Check if first word matches (e.g., "Arova" in both)
-                    if product_normalized and foc_normalized:
-                        product_first = product_normalized.split()[0] if product_normalized.split() else ""
-                        foc_first = foc_normalized.split()[0] if foc_normalized.split() else ""
-                        
-                        if product_first == foc_first and len(product_first) > 2:
-                            # Check if numbers match (e.g., "20" in both)
-                            import re
-                            product_numbers = re.findall(r'\d+', product_normalized)
-                            foc_numbers = re.findall(r'\d+', foc_normalized)
-                            
-                            # If numbers match, it's likely the same product
-                            if product_numbers and foc_numbers:
-                                if any(pn in foc_numbers for pn in product_numbers) or any(fn in product_numbers for fn in foc_numbers):
-                                    foc = f
-                                    break
-                            
-                            # Also check if one name contains the other
-                            if product_normalized in foc_normalized or foc_normalized in product_normalized:
-                                foc = f
-                                break
+                foc = self._match_foc_by_name(product, active_focs)
             
             # Fallback: Try exact product_name match
             if not foc:
-                foc = FOC.query.filter_by(product_name=product.product_name, is_active=True).first()
+                foc = next((f for f in active_focs if f.product_name == product.product_name), None)
             
             if foc:
                 foc_result = foc.get_foc_for_quantity(quantity)
@@ -197,6 +257,54 @@ class PricingService:
                 'scheme_applied': False
             }
     
+    @staticmethod
+    def _normalize_product_name(name):
+        """Normalize product name for matching (remove packaging, dosage, etc.)"""
+        if not name:
+            return ""
+        normalized = name.upper().strip()
+        # Remove packaging info in parentheses
+        if '(' in normalized:
+            normalized = normalized.split('(')[0].strip()
+        # Remove dosage info (mg, etc.)
+        normalized = normalized.replace('MG', '').replace('MG', '').strip()
+        # Replace hyphens and underscores with spaces
+        normalized = normalized.replace('-', ' ').replace('_', ' ')
+        # Remove extra spaces
+        normalized = ' '.join(normalized.split())
+        return normalized
+    
+    def _match_foc_by_name(self, product, focs):
+        """Find the FOC in focs whose product name matches the product's"""
+        product_normalized = self._normalize_product_name(product.product_name)
+        
+        for f in focs:
+            foc_normalized = self._normalize_product_name(f.product_name)
+            
+            # Exact normalized match
+            if foc_normalized == product_normalized:
+                return f
+            
+            # Check if first word matches (e.g., "Arova" in both)
+            if product_normalized and foc_normalized:
+                product_first = product_normalized.split()[0] if product_normalized.split() else ""
+                foc_first = foc_normalized.split()[0] if foc_normalized.split() else ""
+                
+                if product_first == foc_first and len(product_first) > 2:
+                    # Check if numbers match (e.g., "20" in both)
+                    product_numbers = re.findall(r'\d+', product_normalized)
+                    foc_numbers = re.findall(r'\d+', foc_normalized)
+                    
+                    # If numbers match, it's likely the same product
+                    if product_numbers and foc_numbers:
+                        if any(pn in foc_numbers for pn in product_numbers) or any(fn in product_numbers for fn in foc_numbers):
+                            return f
+                    
+                    # Also check if one name contains the other
+                    if product_normalized in foc_normalized or foc_normalized in product_normalized:
+                        return f
+        return None
+    
     def _calculate_discount(self, base_price, discount_type, discount_value, quantity):
         """Calculate discount based on type and value"""
         discount_amount = 0
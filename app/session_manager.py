@@ -19,6 +19,7 @@ logger = logging.getLogger(__name__)
 SESSION_TIMEOUT = 3600  # 1 hour in seconds
 SESSION_MAX_SIZE = 4096  # 4KB max session size
 SESSION_CLEANUP_INTERVAL = 300  # Cleanup every 5 minutes
+SESSION_ACTIVITY_REFRESH = 60  # Rewrite last_activity at most once a minute
 
 # Track last cleanup time
 _last_cleanup = time.time()
@@ -44,8 +45,10 @@ def enforce_session_timeout():
         session.clear()
         return False
     
-    # Update last activity
-    session['last_activity'] = time.time()
+    # Update last activity; writing it marks the cookie session modified and re-signs
+    # it on the response, so skip the write while the stored value is still fresh
+    if elapsed > SESSION_ACTIVITY_REFRESH:
+        session['last_activity'] = time.time()
     return True
 
 
@@ -6,9 +6,10 @@ Handles stock arrival notifications, confirmations, and quantity adjustments
 import logging
 from datetime import datetime, date
 from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy import text
+from sqlalchemy import text, func
 from app import db
 from app.models import DealerWiseStockDetails, Product, User
+from app.database_service import invalidate_dealer_stock_cache
 from app.email_utils import send_stock_arrival_notification, send_quantity_discrepancy_email
 
 # Single logger initialization - removed duplicate
@@ -107,6 +108,17 @@ class StockManagementService:
             self.logger.error(f"Error getting pending stock arrivals: {str(e)}")
             return {'success': False, 'message': f'Error: {str(e)}', 'stocks': []}
     
+    def count_pending_stock_arrivals(self, dealer_unique_id):
+        """Count pending stock arrivals for a dealer without loading the rows"""
+        try:
+            return db.session.query(func.count(DealerWiseStockDetails.id)).filter(
+                DealerWiseStockDetails.dealer_unique_id == dealer_unique_id,
+                DealerWiseStockDetails.status == 'blocked'
+            ).scalar() or 0
+        except Exception as e:
+            self.logger.error(f"Error counting pending stock arrivals: {str(e)}")
+            return 0
+    
     def confirm_stock_arrival(self, stock_detail_id, dealer_user_id, received_quantity=None, adjustment_reason=None):
         """
         Confirm stock arrival by dealer
@@ -190,6 +202,8 @@ class StockManagementService:
             # Commit all changes
             try:
                 db.session.commit()
+                # The raw UPDATE bypasses ORM events, so invalidate cached area stock explicitly
+                invalidate_dealer_stock_cache()
                 
                 # Query fresh from database to get updated record
                 saved_stock = DealerWiseStockDetails.query.get(stock_detail_id)
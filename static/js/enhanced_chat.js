@@ -339,6 +339,8 @@ async function sendMessage(messageText = null) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                // Conversational replies may come back as server-sent events
+                'Accept': 'application/json, text/event-stream',
                 'X-Requested-With': 'XMLHttpRequest'
             },
             body: JSON.stringify({ 
@@ -351,6 +353,11 @@ async function sendMessage(messageText = null) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
+        if ((response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+            await renderStreamedReply(response);
+            return;
+        }
+        
         const data = await response.json();
         
         // Hide loading immediately after response
@@ -502,6 +509,51 @@ async function sendMessage(messageText = null) {
     }
 }
 
+// Render a server-sent-events reply into one bot message as it arrives
+async function renderStreamedReply(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let contentDiv = null;
+    let actionButtons = null;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line; keep any partial event for the next read
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+            if (!event.startsWith('data: ')) continue;
+            const payload = JSON.parse(event.slice(6));
+            if (payload.delta) {
+                text += payload.delta;
+                if (!contentDiv) {
+                    hideTypingIndicator();
+                    addMessage(text, 'bot');
+                    contentDiv = document.querySelector('#chatMessages .message.bot:last-child .bg-light');
+                } else {
+                    contentDiv.innerHTML = formatMessage(text);
+                    const messagesDiv = document.getElementById('chatMessages');
+                    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                }
+            } else if (payload.done) {
+                actionButtons = payload.action_buttons;
+            }
+        }
+    }
+    
+    if (contentDiv && messageHistory.length > 0) {
+        messageHistory[messageHistory.length - 1].message = text;
+    }
+    if (actionButtons && Array.isArray(actionButtons) && actionButtons.length > 0) {
+        showActionButtons(actionButtons);
+    }
+}
+
 // Clean text for TTS (remove markdown, tables, special characters)
 function cleanTextForTTS(text) {
     if (!text) return '';
@@ -2983,34 +3035,39 @@ async function handleBulkProductSelection(event) {
     form.querySelectorAll('button, input').forEach(el => el.disabled = true);
     submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Adding products...';
     
-    // Add each product to cart via API (bypasses LLM to avoid misinterpretation)
+    // Add all products to cart in one API call (bypasses LLM to avoid misinterpretation)
     let successCount = 0;
     let failedProducts = [];
     
-    for (const product of productsToAdd) {
-        try {
-            const response = await fetch('/enhanced-chat/cart/add', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
+    try {
+        const response = await fetch('/enhanced-chat/cart/bulk_add', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                items: productsToAdd.map(product => ({
                     product_code: product.code,
                     quantity: product.quantity
-                })
-            });
-            
-            const data = await response.json();
-            
-            if (response.ok && data.success) {
-                successCount++;
-            } else {
-                failedProducts.push({name: product.name, error: data.error});
-            }
-        } catch (error) {
-            console.error(`Error adding ${product.code}:`, error);
-            failedProducts.push({name: product.name, error: 'Network error'});
+                }))
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok && Array.isArray(data.cart_items)) {
+            successCount = data.cart_items.length;
+            const namesByCode = Object.fromEntries(productsToAdd.map(product => [product.code, product.name]));
+            failedProducts = (data.errors || []).map(err => ({
+                name: namesByCode[err.product_code] || err.product_code,
+                error: err.error
+            }));
+        } else {
+            failedProducts = productsToAdd.map(product => ({name: product.name, error: data.error}));
         }
+    } catch (error) {
+        console.error('Error adding products:', error);
+        failedProducts = productsToAdd.map(product => ({name: product.name, error: 'Network error'}));
     }
     
     // Re-enable all form controls